@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark do Leitor de Dossiês - roda o painel.py sem navegador (streamlit AppTest) sobre um
+repositório sintético no layout pais/liga/temporada/clube/Rodadas/R{n}, usando o backend local
+(STORAGE_BACKEND=local) como substituto offline do GitHub.
+
+Uso:
+    python benchmarks/bench_reader.py --sizes 1000 10000 50000 --output bench.json
+    python benchmarks/bench_reader.py --sizes 1000 --compare bench.json
+
+Cada tamanho roda em um subprocesso próprio, para que o pico de memória (ru_maxrss) e os
+caches de processo do Streamlit não vazem entre medições.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, "painel.py")
+
+# --- 1. REPOSITÓRIO SINTÉTICO ---
+COUNTRIES = [("Brasil", ["Serie A", "Serie B"]), ("Inglaterra", ["Premier League", "Championship"]),
+             ("Espanha", ["La Liga", "Segunda"]), ("Italia", ["Serie A", "Serie B"]), ("Portugal", ["Primeira Liga", "Liga 2"])]
+SEASONS = [str(year) for year in range(2025, 1990, -1)]
+CLUBS_PER_LEAGUE = 20
+ROUNDS = 38
+FORMATIONS = ["4-3-3", "4-2-3-1", "3-5-2", "4-4-2", "5-3-2", "3-4-3"]
+FIRST_NAMES = ["João", "Pedro", "Lucas", "Matheus", "Gabriel", "Rafael", "Thiago", "André", "Bruno", "Caio", "Diego", "Éder"]
+LAST_NAMES = ["Silva", "Souza", "Oliveira", "Santos", "Pereira", "Costa", "Rodrigues", "Almeida", "Araújo", "Gonçalves"]
+WORDS = ("pressão alta transição defensiva bloco médio amplitude profundidade linha de passe corredor central "
+         "meio-campo lateral ponta atacante zagueiro volante construção saída de bola compactação "
+         "contra-ataque bola parada finalização posse recuperação duelo aéreo cobertura").split()
+
+def _sentence(rng, n_words):
+    words = [rng.choice(WORDS) for _ in range(n_words)]
+    return " ".join(words).capitalize() + "."
+
+def _paragraph(rng, n_sentences):
+    return " ".join(_sentence(rng, rng.randint(8, 18)) for _ in range(n_sentences))
+
+def _player(rng):
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+def _table(rng, n_rows):
+    header = "| Jogador | Posição | Jogos | Gols | Assist. | Nota |\n|---|---|---|---|---|---|\n"
+    rows = "".join(
+        f"| {_player(rng)} | {rng.choice(['GOL', 'ZAG', 'LAT', 'VOL', 'MEI', 'ATA'])} | {rng.randint(0, 38)} | "
+        f"{rng.randint(0, 20)} | {rng.randint(0, 12)} | {rng.uniform(5, 9):.1f} |\n"
+        for _ in range(n_rows)
+    )
+    return header + rows
+
+# Seções, tabelas e linhas por tabela de cada tipo de dossiê (~6 a ~18 KB)
+DOSSIER_SHAPES = {"D1P1": (6, 3, 12), "D1P2": (5, 2, 12), "D2P1": (5, 4, 18), "D2P2": (7, 4, 16), "D3": (4, 2, 14), "D4": (4, 1, 12)}
+
+def make_dossier(rng, kind, title, scale=1.0):
+    n_sections, n_tables, n_rows = DOSSIER_SHAPES[kind]
+    parts = [f"# {title}\n"]
+    for i in range(max(1, round(n_sections * scale))):
+        parts.append(f"## {i + 1}. {_sentence(rng, 4)[:-1]}\n")
+        parts.append(_paragraph(rng, 4) + "\n")
+        parts.append("".join(f"- **{_player(rng)}**: {_sentence(rng, 10)}\n" for _ in range(4)))
+        parts.append(f"> Formação base: {rng.choice(FORMATIONS)}. {_sentence(rng, 12)}\n")
+        if i < n_tables:
+            parts.append("### Números\n" + _table(rng, max(1, round(n_rows * scale))))
+    return "\n".join(parts)
+
+def iter_dossiers(n_dossiers, seed=42, scale=1.0):
+    """Gera (caminho, tipo, conteúdo) no layout usado por save_dossier até atingir n_dossiers."""
+    rng = random.Random(seed)
+    count = 0
+    for season in SEASONS:
+        for country, leagues in COUNTRIES:
+            for league in leagues:
+                base = f"{country}/{league}/{season}".replace(" ", "_")
+                league_tag = league.replace(" ", "_")
+                clubs = [f"Clube_{country[:3]}_{league_tag}_{i:02d}" for i in range(CLUBS_PER_LEAGUE)]
+                files = [
+                    (f"{base}/D1P1_Analise_Liga_{league_tag}_{country}.md", "D1P1", f"Análise da Liga {league} {season}"),
+                    (f"{base}/D1P2_Clubes_Dominantes_{league_tag}_{country}.md", "D1P2", f"Clubes Dominantes {league}"),
+                ]
+                for club in clubs:
+                    files.append((f"{base}/{club}/D2P1_Planteis_{club}_{season}.md", "D2P1", f"Plantel {club}"))
+                    files.append((f"{base}/{club}/D2P2_Estudo_Tatico_{club}_{season}.md", "D2P2", f"Estudo Tático {club}"))
+                for n in range(1, ROUNDS + 1):
+                    for home, away in zip(clubs[0::2], clubs[1::2]):
+                        files.append((f"{base}/Rodadas/R{n}/D3_PosRodada_{home}_vs_{away}.md", "D3", f"{home} x {away}"))
+                    for home, away in zip(clubs[0::2], clubs[1::2]):
+                        files.append((f"{base}/{home}/Rodadas/R{n}/D4_Briefing_{home}_vs_{away}.md", "D4", f"Briefing {home} x {away}"))
+                for path, kind, title in files:
+                    yield path, kind, make_dossier(rng, kind, title, scale)
+                    count += 1
+                    if count >= n_dossiers:
+                        return
+
+def build_repository(path, n_dossiers, seed=42, scale=1.0):
+    """Cria um repositório bare com todos os dossiês em um único commit (git fast-import).
+
+    Retorna o primeiro caminho gerado de cada tipo de dossiê, usado como alvo dos cenários.
+    """
+    subprocess.run(["git", "init", "-q", "--bare", "-b", "main", path], check=True)
+    proc = subprocess.Popen(["git", "-C", path, "fast-import", "--quiet"], stdin=subprocess.PIPE)
+    message = f"Repositório sintético: {n_dossiers} dossiês".encode("utf-8")
+    proc.stdin.write(b"commit refs/heads/main\ncommitter Bench <bench@localhost> 1700000000 +0000\n")
+    proc.stdin.write(b"data %d\n%s\n" % (len(message), message))
+    first_paths = {}
+    for file_path, kind, content in iter_dossiers(n_dossiers, seed, scale):
+        data = content.encode("utf-8")
+        proc.stdin.write(b"M 100644 inline %s\ndata %d\n%s\n" % (file_path.encode("utf-8"), len(data), data))
+        first_paths.setdefault(kind, file_path)
+    proc.stdin.close()
+    if proc.wait() != 0:
+        raise RuntimeError("git fast-import falhou")
+    return first_paths
+
+# --- 2. CENÁRIOS ---
+def _timed_run(at):
+    start = time.perf_counter()
+    at.run()
+    elapsed = (time.perf_counter() - start) * 1000
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    return elapsed
+
+def _median_run(at, repeat):
+    return statistics.median(_timed_run(at) for _ in range(repeat))
+
+def _expand(at, file_path):
+    """Abre, no navegador leve, todas as pastas até o arquivo."""
+    parts = file_path.split("/")[:-1]
+    for i in range(1, len(parts) + 1):
+        button = at.button(key=f"dir_{'/'.join(parts[:i])}")
+        if "📁" in button.label:  # ainda fechada
+            button.click()
+            _timed_run(at)
+
+def run_scenarios(n_dossiers, repeat, classic_max, seed, scale):
+    # O repositório sintético e o cache somam centenas de MB nos tamanhos maiores
+    with tempfile.TemporaryDirectory(prefix="painel_bench_", ignore_cleanup_errors=True) as workdir:
+        return _run_scenarios_in(workdir, n_dossiers, repeat, classic_max, seed, scale)
+
+def _run_scenarios_in(workdir, n_dossiers, repeat, classic_max, seed, scale):
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+
+    repo_path = os.path.join(workdir, "repo.git")
+    start = time.perf_counter()
+    sample = build_repository(repo_path, n_dossiers, seed, scale)
+    result = {"dossiers": n_dossiers, "generate_s": round(time.perf_counter() - start, 2)}
+
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    at = AppTest.from_file(APP_PATH, default_timeout=3600)
+    at.secrets.update({
+        "APP_PASSWORD": "bench", "STORAGE_BACKEND": "local", "LOCAL_REPO_PATH": repo_path,
+        "LOCAL_SYNC_INTERVAL": 0, "PAINEL_CACHE_DIR": os.path.join(workdir, "cache"),
+    })
+    at.session_state["password_correct"] = True
+
+    # Navegador: primeiro rerun com caches vazios e reruns seguintes com uma rodada aberta
+    result["navigator_cold_ms"] = round(_timed_run(at), 1)
+    target = sample.get("D2P2") or next(iter(sample.values()))
+    _expand(at, target)
+    round_sample = sample.get("D3")
+    if round_sample:
+        _expand(at, round_sample)
+    result["navigator_warm_ms"] = round(_median_run(at, repeat), 1)
+    if n_dossiers <= classic_max:
+        at.toggle(key="nav_lazy").set_value(False)
+        result["navigator_classic_ms"] = round(_median_run(at, repeat), 1)
+        at.toggle(key="nav_lazy").set_value(True)
+        _timed_run(at)
+
+    # Visualização de um dossiê: primeiro clique (leitura + markdown2) e reruns com o HTML em cache
+    at.button(key=f"view_{target}").click()
+    result["render_cold_ms"] = round(_timed_run(at), 1)
+    result["render_warm_ms"] = round(_median_run(at, repeat), 1)
+
+    # Filtro por nome: cada termo novo percorre o snapshot uma vez
+    filter_times = []
+    for term in ["D4_Briefing", "vs_Clube", "Estudo_Tatico", "R17"][:max(1, repeat)]:
+        at.text_input(key="search_term").input(term)
+        filter_times.append(_timed_run(at))
+    result["filter_ms"] = round(statistics.median(filter_times), 1)
+    at.text_input(key="search_term").input("")
+    _timed_run(at)
+
+    # Gravação de um dossiê D3 pelo formulário
+    at.session_state["selected_action"] = "Carregar Dossiê"
+    _timed_run(at)
+    at.selectbox(key="dossier_type_selector").select("D3 - Análise Tática (Pós Rodada)")
+    _timed_run(at)
+    save_times = []
+    for i in range(repeat):
+        inputs = at.text_input
+        for widget, value in zip(inputs, ["Brasil", "Serie A", "2099", "1", f"Casa{i}", f"Fora{i}"]):
+            widget.input(value)
+        at.text_area[0].input(make_dossier(random.Random(i), "D3", f"Casa{i} x Fora{i}"))
+        at.button[0].click()
+        save_times.append(_timed_run(at))
+        if at.error:
+            raise RuntimeError(at.error[0].value)
+    result["save_ms"] = round(statistics.median(save_times), 1)
+
+    result["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return result
+
+# --- 3. EXECUÇÃO E COMPARAÇÃO ---
+def run_child(size, args):
+    cmd = [sys.executable, os.path.abspath(__file__), "--child", str(size), "--repeat", str(args.repeat),
+           "--classic-max", str(args.classic_max), "--seed", str(args.seed), "--scale", str(args.scale)]
+    proc = subprocess.run(cmd, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"Benchmark com {size} dossiês falhou:\n{proc.stderr[-4000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+def git_revision():
+    proc = subprocess.run(["git", "-C", ROOT, "rev-parse", "--short", "HEAD"], capture_output=True, text=True)
+    return proc.stdout.strip() or None
+
+def compare(results, baseline_path):
+    with open(baseline_path, encoding="utf-8") as fh:
+        baseline = {r["dossiers"]: r for r in json.load(fh)["results"]}
+    for result in results:
+        base = baseline.get(result["dossiers"])
+        if base is None:
+            continue
+        print(f"\n{result['dossiers']} dossiês (atual vs. baseline):", file=sys.stderr)
+        for key, value in result.items():
+            if key != "dossiers" and isinstance(base.get(key), (int, float)) and base[key]:
+                print(f"  {key:<22} {value:>10} {base[key]:>10}  {value / base[key]:.2f}x", file=sys.stderr)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--repeat", type=int, default=3, help="repetições das medições com cache quente")
+    parser.add_argument("--classic-max", type=int, default=10000, help="maior repositório em que o navegador clássico é medido")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--scale", type=float, default=1.0, help="fator sobre o tamanho dos dossiês")
+    parser.add_argument("--output", help="arquivo JSON de saída (padrão: stdout)")
+    parser.add_argument("--compare", help="JSON de uma execução anterior para comparação")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_scenarios(args.child, args.repeat, args.classic_max, args.seed, args.scale)))
+        return
+
+    results = []
+    for size in args.sizes:
+        print(f"Medindo {size} dossiês...", file=sys.stderr)
+        results.append(run_child(size, args))
+    report = {
+        "meta": {"revision": git_revision(), "python": platform.python_version(), "platform": platform.platform(),
+                 "date": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "repeat": args.repeat, "seed": args.seed, "scale": args.scale},
+        "results": results,
+    }
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            fh.write(output + "\n")
+    else:
+        print(output)
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == "__main__":
+    main()
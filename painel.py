@@ -4,13 +4,45 @@ Painel de Inteligência Tática - v21.0: Versão com Otimização Completa de Ca
 """
 
 import streamlit as st
-from github import Github, UnknownObjectException
+from github import Github, InputGitTreeElement, UnknownObjectException
 from datetime import datetime
 import base64
+import bisect
+import gzip
+import hashlib
+import heapq
+import io
+import json
+import logging
+import math
 import os
+import re
+import subprocess
+import tempfile
+import threading
+import time
+import unicodedata
+import uuid
+import zipfile
+import zlib
+from array import array
+from collections import deque, namedtuple, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from streamlit_option_menu import option_menu
 import markdown2
 
+# OCR é opcional: sem as bibliotecas, a extração de texto de imagens/PDFs fica desativada
+try:
+    import pytesseract
+    from PIL import Image, ImageSequence
+except ImportError:
+    pytesseract = None
+try:
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None
+
 # --- 1. CONFIGURAÇÃO E ESTILOS FINAIS ---
 st.set_page_config(page_title="Sistema de Inteligência Tática", page_icon="⚽", layout="wide")
 
@@ -100,6 +132,19 @@ def apply_custom_styling():
 def sanitize_text(text: str) -> str:
     return text.replace('\u00A0', ' ').replace('\u2011', '-')
 
+def get_setting(name, default=None):
+    """Lê uma configuração de st.secrets, com fallback para variáveis de ambiente."""
+    try:
+        if name in st.secrets:
+            return st.secrets[name]
+    except FileNotFoundError:
+        pass
+    return os.environ.get(name, default)
+
+CACHE_DIR = get_setting("PAINEL_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"))
+
+logger = logging.getLogger("painel")
+
 @st.cache_resource
 def get_github_repo():
     try:
@@ -109,30 +154,1386 @@ def get_github_repo():
         st.error(f"Falha na conexão com o GitHub: {e}")
         return None
 
+# --- MÉTRICAS DE DESEMPENHO ---
+# Histogramas de latência dos caminhos quentes, contadores de cache e chamadas ao backend
+# por rerun. Com METRICS_LOG_PATH cada medição também vai para um arquivo JSON Lines.
+LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, float("inf"))
+
+class Metrics:
+    """Registro de métricas compartilhado entre sessões e threads."""
+
+    def __init__(self, log_path=None):
+        self._lock = threading.Lock()
+        self._run = threading.local()
+        self._log = None
+        if log_path:
+            self._log = logging.getLogger("painel.metrics")
+            if not self._log.handlers:
+                handler = logging.FileHandler(log_path, encoding="utf-8")
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                self._log.addHandler(handler)
+                self._log.setLevel(logging.INFO)
+                self._log.propagate = False
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started_at = time.time()
+            self.latencies = {}  # nome -> {"count", "total_ms", "max_ms", "buckets"}
+            self.counters = {}
+            self.calls_per_run = deque(maxlen=500)
+
+    def observe(self, name, ms):
+        with self._lock:
+            hist = self.latencies.setdefault(name, {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "buckets": [0] * len(LATENCY_BUCKETS_MS)})
+            hist["count"] += 1
+            hist["total_ms"] += ms
+            hist["max_ms"] = max(hist["max_ms"], ms)
+            hist["buckets"][bisect.bisect_left(LATENCY_BUCKETS_MS, ms)] += 1
+        self.log_event(name, ms=round(ms, 3))
+
+    @contextmanager
+    def timer(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, (time.perf_counter() - start) * 1000)
+
+    def incr(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def count_backend_call(self):
+        if getattr(self._run, "calls", None) is not None:
+            self._run.calls += 1
+            self.incr("backend.chamadas")
+        else:
+            self.incr("backend.chamadas_em_segundo_plano")
+
+    def begin_run(self):
+        self._run.calls = 0
+        self._run.start = time.perf_counter()
+
+    def end_run(self):
+        calls, self._run.calls = getattr(self._run, "calls", None), None
+        if calls is None:
+            return
+        with self._lock:
+            self.calls_per_run.append(calls)
+        self.observe("ui.rerun", (time.perf_counter() - self._run.start) * 1000)
+        self.log_event("ui.rerun.chamadas_backend", calls=calls)
+
+    def log_event(self, name, **fields):
+        if self._log is not None:
+            self._log.info(json.dumps({"ts": round(time.time(), 3), "metric": name, **fields}))
+
+    @staticmethod
+    def percentile(hist, q):
+        """Limite superior do bucket que contém o quantil q."""
+        target, seen = q * hist["count"], 0
+        for bound, count in zip(LATENCY_BUCKETS_MS, hist["buckets"]):
+            seen += count
+            if seen >= target:
+                return min(bound, hist["max_ms"])
+        return hist["max_ms"]
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "started_at": self.started_at,
+                "latencies": {k: dict(v, buckets=list(v["buckets"])) for k, v in self.latencies.items()},
+                "counters": dict(self.counters),
+                "calls_per_run": list(self.calls_per_run),
+            }
+
+@st.cache_resource
+def get_metrics():
+    return Metrics(get_setting("METRICS_LOG_PATH"))
+
+class InstrumentedBackend:
+    """Envolve um StorageBackend medindo a latência e contando as chamadas de cada método."""
+
+    UNTIMED = {"rate_limit", "sync_status"}
+
+    def __init__(self, backend):
+        self._backend = backend
+
+    def __getattr__(self, name):
+        attr = getattr(self._backend, name)
+        if not callable(attr) or name.startswith("_") or name in self.UNTIMED:
+            return attr
+        def timed_call(*args, **kwargs):
+            metrics = get_metrics()
+            metrics.count_backend_call()
+            with metrics.timer(f"backend.{name}"):
+                return attr(*args, **kwargs)
+        return timed_call
+
+# --- BACKENDS DE ARMAZENAMENTO ---
+# Toda a E/S de dossiês passa por esta interface. O backend é escolhido por STORAGE_BACKEND:
+# "github" (padrão, via PyGithub) ou "local" (cópia de trabalho ou repositório bare em disco).
+RepoEntry = namedtuple("RepoEntry", ["name", "path", "type", "sha", "size"])
+CommitRef = namedtuple("CommitRef", ["sha", "parent_sha"])
+
+def git_blob_sha(data: bytes) -> str:
+    """SHA que o git atribui a um blob com este conteúdo."""
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+class StorageBackend:
+    """Interface comum dos backends de armazenamento dos dossiês."""
+
+    def head_sha(self):
+        """SHA do commit mais recente do branch de trabalho."""
+        raise NotImplementedError
+
+    def list_tree(self, commit_sha):
+        """Lista recursiva de RepoEntry do commit, ou None se não couber em uma resposta."""
+        raise NotImplementedError
+
+    def list_dir(self, path=""):
+        """Pastas e arquivos .md diretamente abaixo de path, ordenados por nome."""
+        raise NotImplementedError
+
+    def read_blob(self, path, sha=None):
+        """Conteúdo bruto do arquivo e o SHA do blob lido."""
+        raise NotImplementedError
+
+    def recent_paths(self, limit):
+        """Caminhos de dossiês alterados mais recentemente, do mais novo para o mais antigo."""
+        raise NotImplementedError
+
+    def rate_limit(self):
+        """(restantes, limite) de chamadas à API, ou None quando não há limite."""
+        return None
+
+    def sync_status(self):
+        """Estado da sincronização com o remoto ({"ultima": instante, "erro": mensagem}), ou None se não sincroniza."""
+        return None
+
+    def changed_paths(self, base_sha, head_sha):
+        """{caminho: novo SHA do blob ou None se removido} entre dois commits, ou None se grande demais."""
+        raise NotImplementedError
+
+    def create_file(self, path, message, content):
+        """Cria o arquivo em um novo commit e retorna o CommitRef."""
+        raise NotImplementedError
+
+    def commit_files(self, files, message, progress=None):
+        """Grava {caminho: conteúdo} em um único commit e retorna o CommitRef."""
+        raise NotImplementedError
+
+    def delete_file(self, path, message, sha):
+        """Remove o arquivo (se ainda estiver no blob sha) e retorna o CommitRef."""
+        raise NotImplementedError
+
+def _sorted_listing(entries):
+    dirs = sorted([c for c in entries if c.type == 'dir'], key=lambda x: x.name)
+    files = sorted([f for f in entries if f.type == 'file' and f.name.endswith(".md")], key=lambda x: x.name)
+    return dirs, files
+
+class GitHubBackend(StorageBackend):
+    def __init__(self, repo):
+        self.repo = repo
+
+    def head_sha(self):
+        return self.repo.get_branch(self.repo.default_branch).commit.sha
+
+    def list_tree(self, commit_sha):
+        tree = self.repo.get_git_tree(commit_sha, recursive=True)
+        if tree.raw_data.get("truncated"):
+            return None
+        return [
+            RepoEntry(os.path.basename(el.path), el.path, 'dir' if el.type == 'tree' else 'file', el.sha, el.size)
+            for el in tree.tree if el.type in ('tree', 'blob')
+        ]
+
+    def list_dir(self, path=""):
+        return _sorted_listing([RepoEntry(c.name, c.path, c.type, c.sha, c.size) for c in self.repo.get_contents(path)])
+
+    def read_blob(self, path, sha=None):
+        if sha:
+            return base64.b64decode(self.repo.get_git_blob(sha).content), sha
+        content_obj = self.repo.get_contents(path)
+        return content_obj.decoded_content, content_obj.sha
+
+    def changed_paths(self, base_sha, head_sha):
+        comparison = self.repo.compare(base_sha, head_sha)
+        # A comparação parte da base comum: se HEAD voltou ou divergiu (force-push), a lista não
+        # descreve base..head e só a árvore completa é confiável
+        if comparison.status not in ("ahead", "identical"):
+            return None
+        files = comparison.files
+        if len(files) >= 300:  # limite da API de comparação: lista possivelmente incompleta
+            return None
+        changes = {}
+        for f in files:
+            if f.status == "renamed" and f.previous_filename:
+                changes[f.previous_filename] = None
+            changes[f.filename] = None if f.status == "removed" else f.sha
+        return changes
+
+    def recent_paths(self, limit):
+        paths = []
+        for commit in self.repo.get_commits()[:10]:
+            for f in commit.files:
+                if f.status != "removed" and f.filename.endswith(".md") and f.filename not in paths:
+                    paths.append(f.filename)
+            if len(paths) >= limit:
+                break
+        return paths[:limit]
+
+    def rate_limit(self):
+        remaining, limit = self.repo.requester.rate_limiting
+        return None if remaining < 0 else (remaining, limit)
+
+    def create_file(self, path, message, content):
+        commit = self.repo.create_file(path, message, content)["commit"]
+        return CommitRef(commit.sha, commit.parents[0].sha if commit.parents else None)
+
+    def delete_file(self, path, message, sha):
+        commit = self.repo.delete_file(path, message, sha)["commit"]
+        return CommitRef(commit.sha, commit.parents[0].sha if commit.parents else None)
+
+    def commit_files(self, files, message, progress=None):
+        # Git Data API: um blob por arquivo, depois uma árvore e um commit para o lote inteiro
+        ref = self.repo.get_git_ref(f"heads/{self.repo.default_branch}")
+        parent = self.repo.get_git_commit(ref.object.sha)
+        elements = []
+        for i, (path, content) in enumerate(files.items(), start=1):
+            blob = self.repo.create_git_blob(content, "utf-8")
+            elements.append(InputGitTreeElement(path, "100644", "blob", sha=blob.sha))
+            if progress:
+                progress(i, len(files))
+        tree = self.repo.create_git_tree(elements, parent.tree)
+        commit = self.repo.create_git_commit(message, tree, [parent])
+        ref.edit(commit.sha)
+        return CommitRef(commit.sha, parent.sha)
+
+class LocalGitBackend(StorageBackend):
+    """Lê direto dos objetos git em disco e sincroniza com o remoto em segundo plano."""
+
+    def __init__(self, path, branch=None, remote="origin", sync_interval=60):
+        self.path = path
+        self.remote = remote
+        self.bare = self._git("rev-parse", "--is-bare-repository").strip() == "true"
+        self.branch = branch or self._git("symbolic-ref", "--short", "HEAD").strip()
+        self._identity = []
+        if not self._git("config", "user.name", check=False).strip():
+            self._identity = ["-c", "user.name=Painel de Inteligência", "-c", "user.email=painel@localhost"]
+        self._write_lock = threading.Lock()
+        self._sync_event = threading.Event()
+        self._sync_state = None
+        if sync_interval and self.remote in self._git("remote").split():
+            self._sync_state = {"ultima": None, "erro": None}
+            threading.Thread(target=self._sync_loop, args=(sync_interval,), daemon=True, name="painel-git-sync").start()
+
+    def _git(self, *args, input=None, env=None, check=True, raw=False):
+        result = subprocess.run(["git", "-C", self.path, *args], input=input, env=env, capture_output=True, check=False)
+        if check and result.returncode != 0:
+            raise RuntimeError(f"git {args[0]}: {result.stderr.decode('utf-8', 'replace').strip()}")
+        return result.stdout if raw else result.stdout.decode("utf-8")
+
+    def head_sha(self):
+        return self._git("rev-parse", f"refs/heads/{self.branch}").strip()
+
+    def _parse_ls_tree(self, output):
+        entries = []
+        for record in output.split("\0"):
+            if not record:
+                continue
+            meta, path = record.split("\t", 1)
+            _, obj_type, sha, size = meta.split()
+            if obj_type in ('tree', 'blob'):
+                entries.append(RepoEntry(os.path.basename(path), path, 'dir' if obj_type == 'tree' else 'file', sha, 0 if size == "-" else int(size)))
+        return entries
+
+    def list_tree(self, commit_sha):
+        return self._parse_ls_tree(self._git("ls-tree", "-r", "-t", "-l", "-z", commit_sha))
+
+    def list_dir(self, path=""):
+        args = ["ls-tree", "-l", "-z", self.head_sha()]
+        if path:
+            args += ["--", path.rstrip("/") + "/"]
+        return _sorted_listing(self._parse_ls_tree(self._git(*args)))
+
+    def read_blob(self, path, sha=None):
+        if not sha:
+            sha = self._git("rev-parse", f"{self.head_sha()}:{path}").strip()
+        return self._git("cat-file", "blob", sha, raw=True), sha
+
+    def changed_paths(self, base_sha, head_sha):
+        changes = {}
+        records = self._git("diff-tree", "-r", "-z", "--no-renames", base_sha, head_sha).split("\0")
+        for meta, path in zip(records[0::2], records[1::2]):
+            _, _, _, new_sha, status = meta.split()
+            changes[path] = None if status == "D" else new_sha
+        return changes
+
+    def recent_paths(self, limit):
+        paths = []
+        for path in self._git("log", "--diff-filter=AM", "--name-only", "--format=", "-n", "200", self.head_sha()).splitlines():
+            if path.endswith(".md") and path not in paths:
+                paths.append(path)
+                if len(paths) >= limit:
+                    break
+        return paths
+
+    def _blob_sha_at_head(self, path):
+        return self._git("rev-parse", "-q", "--verify", f"{self.head_sha()}:{path}", check=False).strip() or None
+
+    def commit_changes(self, changes, message):
+        """Grava {caminho: bytes ou None para remover} em um único commit sobre o branch."""
+        with self._write_lock:
+            parent = self.head_sha()
+            records = {}
+            for path, data in changes.items():
+                records[path] = None if data is None else ("100644", self._git("hash-object", "-w", "--stdin", input=data).strip())
+            tree = self._build_tree(parent, records)
+            commit = self._git(*self._identity, "commit-tree", tree, "-p", parent, "-m", message).strip()
+            self._advance_branch(parent, commit)
+        self._sync_event.set()
+        return CommitRef(commit, parent)
+
+    def _build_tree(self, base, records):
+        """Árvore de base com {caminho: (modo, blob) ou None para remover} aplicado, num índice temporário."""
+        with tempfile.TemporaryDirectory() as tmp:
+            env = {**os.environ, "GIT_INDEX_FILE": os.path.join(tmp, "index")}
+            self._git("read-tree", base, env=env)
+            # --index-info não exige work tree (funciona em repositórios bare); modo 0 remove a entrada
+            lines = [f"0 {'0' * 40}\t{path}\0" if entry is None else f"{entry[0]} {entry[1]}\t{path}\0" for path, entry in records.items()]
+            self._git("update-index", "-z", "--index-info", input="".join(lines).encode("utf-8"), env=env)
+            return self._git("write-tree", env=env).strip()
+
+    def _replay_onto(self, onto, local):
+        """Reaplica sobre onto os commits locais que o remoto não tem; retorna o novo topo.
+
+        As gravações do app só adicionam, substituem ou removem caminhos inteiros, então cada
+        commit é refeito com os mesmos blobs; num caminho alterado dos dois lados prevalece o local.
+        """
+        merge_base = self._git("merge-base", onto, local).strip()
+        remote_paths = set(self.changed_paths(merge_base, onto))
+        tip = onto
+        for commit in self._git("rev-list", "--reverse", "--first-parent", f"{merge_base}..{local}").split():
+            records = {}
+            fields = self._git("diff-tree", "-r", "-z", "--no-renames", f"{commit}^", commit).split("\0")
+            for meta, path in zip(fields[0::2], fields[1::2]):
+                _, new_mode, _, new_sha, status = meta.split()
+                records[path] = None if status == "D" else (new_mode, new_sha)
+                if path in remote_paths:
+                    logger.warning("%s foi alterado no remoto e localmente; mantida a versão local de %s.", path, commit[:7])
+            tree = self._build_tree(tip, records)
+            name, email, date = self._git("log", "-1", "--format=%an%n%ae%n%ad", "--date=raw", commit).splitlines()
+            env = {**os.environ, "GIT_AUTHOR_NAME": name, "GIT_AUTHOR_EMAIL": email, "GIT_AUTHOR_DATE": date}
+            message = self._git("log", "-1", "--format=%B", commit, raw=True)
+            tip = self._git(*self._identity, "commit-tree", tree, "-p", tip, input=message, env=env).strip()
+        return tip
+
+    def _advance_branch(self, old, new):
+        """Move refs/heads/<branch> de old para new; a work tree só acompanha se esse branch estiver em uso."""
+        self._git("update-ref", f"refs/heads/{self.branch}", new, old)
+        if self.bare or self._git("symbolic-ref", "-q", "--short", "HEAD", check=False).strip() != self.branch:
+            return
+        # Fast-forward de índice e work tree sem mexer em alterações locais que não conflitem
+        result = subprocess.run(["git", "-C", self.path, "read-tree", "-m", "-u", old, new], capture_output=True)
+        if result.returncode != 0:
+            logger.warning("Branch %s avançou, mas a work tree de %s não foi atualizada: %s", self.branch, self.path, result.stderr.decode("utf-8", "replace").strip())
+
+    def create_file(self, path, message, content):
+        if self._blob_sha_at_head(path):
+            raise FileExistsError(f"{path} já existe")
+        return self.commit_changes({path: content.encode("utf-8") if isinstance(content, str) else content}, message)
+
+    def delete_file(self, path, message, sha):
+        if self._blob_sha_at_head(path) != sha:
+            raise ValueError(f"{path} foi alterado ou removido por outra pessoa")
+        return self.commit_changes({path: None}, message)
+
+    def commit_files(self, files, message, progress=None):
+        commit = self.commit_changes({path: content.encode("utf-8") for path, content in files.items()}, message)
+        if progress:
+            progress(len(files), len(files))
+        return commit
+
+    def _sync_loop(self, interval):
+        while True:
+            self._sync_event.wait(interval)
+            self._sync_event.clear()
+            try:
+                self.sync()
+                self._sync_state = {"ultima": time.time(), "erro": None}
+            except Exception as e:
+                logger.warning("Falha ao sincronizar %s com %s: %s", self.path, self.remote, e)
+                self._sync_state = {**self._sync_state, "erro": str(e)}
+
+    def sync_status(self):
+        return self._sync_state
+
+    def sync(self):
+        """Avança o branch local com o remoto (fast-forward) e envia commits locais pendentes."""
+        with self._write_lock:
+            self._git("fetch", "-q", self.remote, self.branch)
+            local, remote = self.head_sha(), self._git("rev-parse", "FETCH_HEAD").strip()
+            if local == remote:
+                return
+            if self._is_ancestor(local, remote):
+                self._advance_branch(local, remote)
+            elif self._is_ancestor(remote, local):
+                self._git("push", "-q", self.remote, f"refs/heads/{self.branch}")
+            else:
+                # O remoto andou enquanto havia commits locais pendentes (ex.: push recusado)
+                rebased = self._replay_onto(remote, local)
+                self._advance_branch(local, rebased)
+                self._git("push", "-q", self.remote, f"refs/heads/{self.branch}")
+                logger.info("Commits locais de %s reaplicados sobre %s/%s.", self.branch, self.remote, self.branch)
+
+    def _is_ancestor(self, ancestor, descendant):
+        return subprocess.run(["git", "-C", self.path, "merge-base", "--is-ancestor", ancestor, descendant], capture_output=True).returncode == 0
+
+@st.cache_resource
+def get_storage_backend():
+    if get_setting("STORAGE_BACKEND", "github") == "local":
+        try:
+            return InstrumentedBackend(LocalGitBackend(
+                get_setting("LOCAL_REPO_PATH", "."),
+                branch=get_setting("LOCAL_REPO_BRANCH"),
+                remote=get_setting("LOCAL_REPO_REMOTE", "origin"),
+                sync_interval=int(get_setting("LOCAL_SYNC_INTERVAL", 60)),
+            ))
+        except Exception as e:
+            st.error(f"Falha ao abrir o repositório local: {e}")
+            return None
+    github_repo = get_github_repo()
+    return InstrumentedBackend(GitHubBackend(github_repo)) if github_repo else None
+
+# --- SNAPSHOT DA ÁRVORE DO REPOSITÓRIO ---
+# Uma única chamada à API (árvore recursiva) substitui um get_contents por pasta.
+# O snapshot é indexado pelo SHA do commit de HEAD e só é buscado de novo quando ele muda.
+class RepoSnapshot:
+    """Índice em memória (caminho -> filhos) da árvore completa de um commit."""
+
+    def __init__(self, sha, entries):
+        self.sha = sha
+        self.children = {"": ([], [])}
+        self.other_files = {}  # pasta -> nomes que não são .md (não listados, mas mantêm a pasta viva)
+        self._matching_dirs = {}
+        self._facets = None
+        for entry in sorted(entries, key=lambda e: e.path):
+            parent = os.path.dirname(entry.path)
+            dirs, files = self.children.setdefault(parent, ([], []))
+            if entry.type == 'dir':
+                self.children.setdefault(entry.path, ([], []))
+                dirs.append(entry)
+            elif entry.name.endswith(".md"):
+                files.append(entry)
+            else:
+                self.other_files.setdefault(parent, set()).add(entry.name)
+        for dirs, files in self.children.values():
+            dirs.sort(key=lambda x: x.name)
+            files.sort(key=lambda x: x.name)
+
+    def list_dir(self, path=""):
+        return self.children.get(path, ([], []))
+
+    def apply_changes(self, sha, changes):
+        """Novo snapshot para o commit sha, copiando apenas as pastas afetadas por changes."""
+        snapshot = RepoSnapshot(sha, [])
+        snapshot.children = dict(self.children)
+        snapshot.other_files = dict(self.other_files)
+        touched = set()
+
+        def editable(path):
+            if path not in touched:
+                dirs, files = snapshot.children.get(path, ([], []))
+                snapshot.children[path] = (list(dirs), list(files))
+                touched.add(path)
+            return snapshot.children[path]
+
+        for path, blob_sha in changes.items():
+            parent, name = os.path.dirname(path), os.path.basename(path)
+            if blob_sha is None and self.get_entry(path) is None and name not in self.other_files.get(parent, ()):
+                continue  # remoção de algo que este snapshot não tem
+            files = editable(parent)[1]
+            files[:] = [f for f in files if f.name != name]
+            if not name.endswith(".md"):
+                others = set(snapshot.other_files.get(parent, ()))
+                others.discard(name)
+                if blob_sha is not None:
+                    others.add(name)
+                if others:
+                    snapshot.other_files[parent] = others
+                else:
+                    snapshot.other_files.pop(parent, None)
+            if blob_sha is None:
+                continue
+            if name.endswith(".md"):
+                files.append(RepoEntry(name, path, 'file', blob_sha, 0))
+            child = parent
+            while child:
+                dirs = editable(os.path.dirname(child))[0]
+                if any(d.path == child for d in dirs):
+                    break
+                dirs.append(RepoEntry(os.path.basename(child), child, 'dir', None, 0))
+                child = os.path.dirname(child)
+        # Pastas que ficaram vazias deixam de existir, como no git
+        # (da mais funda para a mais rasa: cada pasta só é avaliada depois das suas subpastas)
+        pending = [(-len(path), path) for path in touched]
+        heapq.heapify(pending)
+        while pending:
+            path = heapq.heappop(pending)[1]
+            if path and path in snapshot.children and snapshot.children[path] == ([], []) and path not in snapshot.other_files:
+                del snapshot.children[path]
+                parent = os.path.dirname(path)
+                dirs = editable(parent)[0]
+                dirs[:] = [d for d in dirs if d.path != path]
+                heapq.heappush(pending, (-len(parent), parent))
+        for path in touched:
+            if path in snapshot.children:
+                dirs, files = snapshot.children[path]
+                dirs.sort(key=lambda x: x.name)
+                files.sort(key=lambda x: x.name)
+        return snapshot
+
+    @property
+    def facets(self):
+        """Índice de metadados do snapshot, montado na primeira consulta."""
+        if self._facets is None:
+            self._facets = FacetIndex(self)
+        return self._facets
+
+    def get_entry(self, path):
+        for f in self.list_dir(os.path.dirname(path))[1]:
+            if f.path == path:
+                return f
+        return None
+
+    def iter_files(self):
+        for _, files in self.children.values():
+            yield from files
+
+    def dirs_matching(self, search_term):
+        """Pastas que contêm (em qualquer nível) arquivos cujo nome casa com o filtro."""
+        term = search_term.lower()
+        if term not in self._matching_dirs:
+            matching = set()
+            for f in self.iter_files():
+                if term in f.name.lower():
+                    parent = os.path.dirname(f.path)
+                    while parent and parent not in matching:
+                        matching.add(parent)
+                        parent = os.path.dirname(parent)
+            if len(self._matching_dirs) > 32:
+                self._matching_dirs.clear()
+            self._matching_dirs[term] = matching
+        return self._matching_dirs[term]
+
+@st.cache_data(ttl=60)  # HEAD é consultado no máximo uma vez por minuto
+def get_head_sha(_repo):
+    """Retorna o SHA do commit mais recente do branch padrão."""
+    try:
+        return _repo.head_sha()
+    except Exception as e:
+        st.error(f"Erro ao consultar o último commit do repositório: {e}")
+        return None
+
+def load_repo_snapshot(repo, head_sha):
+    """Busca a árvore recursiva do commit em uma única chamada e monta o índice."""
+    try:
+        entries = repo.list_tree(head_sha)
+        if entries is None:
+            # Árvore grande demais para uma resposta: volta à listagem por pasta.
+            return None
+        return RepoSnapshot(head_sha, entries)
+    except Exception as e:
+        st.error(f"Erro ao carregar a árvore do repositório: {e}")
+        return None
+
+# --- FEED DE MUDANÇAS ---
+# Guarda o último commit visto e, quando HEAD muda (ou o próprio app grava algo), aplica só
+# os caminhos alterados: snapshot/listagens, blobs antigos, HTML renderizado e índice de busca.
+class ChangeFeed:
+    """Acompanha o último commit visto e invalida apenas o que mudou desde ele."""
+
+    def __init__(self):
+        self.snapshot = None
+        self.failed_sha = None  # HEAD cuja árvore completa não pôde ser carregada
+        self.lock = threading.Lock()
+
+    @property
+    def last_sha(self):
+        return self.snapshot.sha if self.snapshot is not None else None
+
+    def advance(self, repo, head_sha):
+        """Leva o snapshot até head_sha, pelo diff de commits quando possível."""
+        with self.lock:
+            if self.snapshot is not None and self.snapshot.sha == head_sha:
+                return self.snapshot
+            if self.failed_sha == head_sha:
+                # Uma única tentativa por HEAD: árvore truncada ou erro só mudam com um novo commit
+                return None
+            metrics = get_metrics()
+            changes = None
+            if self.snapshot is not None:
+                try:
+                    changes = repo.changed_paths(self.snapshot.sha, head_sha)
+                except Exception as e:
+                    logger.warning("Diff %s..%s indisponível, recarregando a árvore: %s", self.snapshot.sha, head_sha, e)
+            if changes is None:
+                metrics.incr("snapshot.carga_completa")
+                snapshot = load_repo_snapshot(repo, head_sha)
+                get_listing_cache().invalidate()
+                if snapshot is None:
+                    self.failed_sha = head_sha
+                    return None
+                self.snapshot = snapshot
+            else:
+                metrics.incr("snapshot.atualizacao_incremental")
+                self._apply(head_sha, changes)
+            return self.snapshot
+
+    def record_write(self, commit, changes):
+        """Aplica direto uma gravação do próprio app, sem esperar o próximo HEAD."""
+        with self.lock:
+            if self.snapshot is not None and self.snapshot.sha == commit.parent_sha:
+                self._apply(commit.sha, changes)
+            else:
+                # Outro commit entrou no meio: o diff no próximo HEAD cobre tudo.
+                self._invalidate(changes)
+
+    def _apply(self, sha, changes):
+        self._invalidate(changes)
+        self.snapshot = self.snapshot.apply_changes(sha, changes)
+
+    def _invalidate(self, changes):
+        get_listing_cache().invalidate({os.path.dirname(p) for p in changes})
+        search_index = get_search_index()
+        with search_index.lock:
+            for path in changes:
+                search_index.remove(path)
+        if self.snapshot is None:
+            return
+        for path in changes:
+            old = self.snapshot.get_entry(path)
+            if old is not None and old.sha != changes[path]:
+                get_render_cache().discard_sha(old.sha)
+                get_content_cache().discard_sha(old.sha)
+                get_blob_cache().discard(old.sha)
+
+@st.cache_resource
+def get_change_feed():
+    return ChangeFeed()
+
+def get_repo_snapshot(repo):
+    head_sha = get_head_sha(repo)
+    if not head_sha:
+        return None
+    return get_change_feed().advance(repo, head_sha)
+
+def record_write(commit, changes):
+    get_change_feed().record_write(commit, changes)
+    get_head_sha.clear()
+
+def list_dir(repo, path=""):
+    """Lista pastas e arquivos a partir do snapshot, com fallback para a API por pasta."""
+    snapshot = get_repo_snapshot(repo)
+    if snapshot is not None:
+        return snapshot.list_dir(path)
+    return list_repo_contents(repo, path)
+
 # NOVA FUNÇÃO DE CACHE PARA LISTAGEM DE ARQUIVOS
-@st.cache_data(ttl=600)  # Cache da lista de arquivos por 10 minutos
-def list_repo_contents(_repo, path=""):
+class ListingCache:
+    """Listagens por pasta com validade, invalidáveis pasta a pasta."""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}  # pasta -> (instante, (dirs, files))
+
+    def get(self, path):
+        entry = self._entries.get(path)
+        if entry is not None and time.monotonic() - entry[0] < self.ttl:
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        return None
+
+    def put(self, path, listing):
+        self._entries[path] = (time.monotonic(), listing)
+
+    def invalidate(self, paths=None):
+        if paths is None:
+            self._entries.clear()
+        for path in paths or ():
+            self._entries.pop(path, None)
+
+@st.cache_resource
+def get_listing_cache():
+    return ListingCache(ttl=600)  # Cache da lista de arquivos por 10 minutos
+
+def list_repo_contents(repo, path=""):
     """Busca e armazena em cache a lista de arquivos e diretórios de um caminho."""
+    listing_cache = get_listing_cache()
+    listing = listing_cache.get(path)
+    if listing is not None:
+        return listing
     try:
-        contents = _repo.get_contents(path)
-        dirs = sorted([c for c in contents if c.type == 'dir'], key=lambda x: x.name)
-        files = sorted([f for f in contents if f.type == 'file' and f.name.endswith(".md")], key=lambda x: x.name)
-        return dirs, files
+        listing = repo.list_dir(path)
+        listing_cache.put(path, listing)
+        return listing
     except Exception as e:
         st.error(f"Erro ao listar o conteúdo do repositório: {e}")
         return [], []
 
-@st.cache_data(ttl=3600)  # Cache do conteúdo do arquivo por 1 hora
-def get_file_content(_repo, file_path):
-    """Busca e armazena em cache o conteúdo de um arquivo do GitHub."""
+# --- CACHE PERSISTENTE DE BLOBS ---
+# Endereçado pelo SHA do blob: um arquivo alterado ganha um SHA novo (cache miss imediato)
+# e um SHA já visto nunca precisa ser baixado de novo, nem após reinício ou redeploy.
+class BlobCache:
+    """Cache em disco de blobs comprimidos, limitado por tamanho com despejo LRU."""
+
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # sha -> bytes em disco, do menos para o mais recente
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(root, exist_ok=True)
+        found = []
+        for dirpath, _, names in os.walk(root):
+            for name in names:
+                if name.endswith(".tmp"):
+                    continue
+                stat = os.stat(os.path.join(dirpath, name))
+                found.append((stat.st_mtime, os.path.basename(dirpath) + name, stat.st_size))
+        for _, sha, size in sorted(found):
+            self._entries[sha] = size
+            self._size += size
+
+    def _path(self, sha):
+        return os.path.join(self.root, sha[:2], sha[2:])
+
+    def __contains__(self, sha):
+        return sha in self._entries
+
+    def get(self, sha):
+        with self._lock:
+            if sha not in self._entries:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(sha)
+        path = self._path(sha)
+        try:
+            with open(path, "rb") as fh:
+                data = zlib.decompress(fh.read())
+            os.utime(path)  # preserva a ordem LRU entre reinícios
+            return data
+        except (OSError, zlib.error):
+            self.discard(sha)
+            return None
+
+    def put(self, sha, data: bytes):
+        compressed = zlib.compress(data, 6)
+        path = self._path(sha)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as fh:
+            fh.write(compressed)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._size += len(compressed) - self._entries.get(sha, 0)
+            self._entries[sha] = len(compressed)
+            self._entries.move_to_end(sha)
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                old_sha, old_size = self._entries.popitem(last=False)
+                self._size -= old_size
+                self._remove_file(old_sha)
+
+    def discard(self, sha):
+        with self._lock:
+            self._size -= self._entries.pop(sha, 0)
+            self._remove_file(sha)
+
+    def _remove_file(self, sha):
+        try:
+            os.remove(self._path(sha))
+        except OSError:
+            pass
+
+@st.cache_resource
+def get_blob_cache():
+    max_mb = int(get_setting("PAINEL_BLOB_CACHE_MB", 256))
+    return BlobCache(os.path.join(CACHE_DIR, "blobs"), max_mb * 1024 * 1024)
+
+def fetch_blob(repo, file_path, sha=None):
+    """Conteúdo do arquivo pelo cache local de blobs, indo ao backend só em caso de falta."""
+    blob_cache = get_blob_cache()
+    if sha:
+        data = blob_cache.get(sha)
+        if data is not None:
+            return data.decode("utf-8")
+    data, sha = repo.read_blob(file_path, sha)
+    blob_cache.put(sha, data)
+    return data.decode("utf-8")
+
+def get_file_content(repo, file_path, sha=None):
+    """Busca o conteúdo de um arquivo, servindo do cache local de blobs quando possível."""
     try:
-        content_obj = _repo.get_contents(file_path)
-        decoded_content = content_obj.decoded_content.decode("utf-8")
-        return decoded_content
+        return fetch_blob(repo, file_path, sha)
     except Exception as e:
         st.error(f"Erro ao buscar o conteúdo do arquivo {file_path}: {e}")
         return None
 
+# --- CACHE DE RENDERIZAÇÃO ---
+# O HTML de um dossiê só depende do blob, do tema e das extensões do markdown2;
+# reruns (ex.: digitar no filtro) não reprocessam um dossiê que não mudou.
+MARKDOWN_EXTRAS = ('tables', 'fenced-code-blocks', 'blockquote')
+
+class MemoryTextCache:
+    """Cache em memória de textos, limitado por tamanho com despejo LRU; a chave começa pelo SHA do blob."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (sha, ...) -> texto
+        self._size = 0
+
+    def get(self, key):
+        with self._lock:
+            text = self._entries.get(key)
+            if text is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+            return text
+
+    def discard_sha(self, sha):
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == sha]:
+                self._size -= len(self._entries.pop(key))
+
+    def put(self, key, text):
+        with self._lock:
+            if key in self._entries:
+                self._size -= len(self._entries.pop(key))
+            self._entries[key] = text
+            self._size += len(text)
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                _, old_text = self._entries.popitem(last=False)
+                self._size -= len(old_text)
+
+@st.cache_resource
+def get_render_cache():
+    max_mb = int(get_setting("PAINEL_RENDER_CACHE_MB", 64))
+    return MemoryTextCache(max_mb * 1024 * 1024)
+
+# Texto dos dossiês abertos, compartilhado por todas as sessões: o session_state guarda só
+# a referência (caminho + SHA), então a memória não cresce com usuários x tamanho do arquivo.
+@st.cache_resource
+def get_content_cache():
+    max_mb = int(get_setting("PAINEL_CONTENT_CACHE_MB", 64))
+    return MemoryTextCache(max_mb * 1024 * 1024)
+
+def get_dossier_text(repo, path, sha):
+    """Texto do dossiê pelo cache compartilhado em memória, com o cache de blobs em disco por trás."""
+    content_cache = get_content_cache()
+    text = content_cache.get((sha,))
+    if text is None:
+        text = get_file_content(repo, path, sha)
+        if text is not None:
+            content_cache.put((sha,), text)
+    return text
+
+@st.cache_resource
+def get_markdown_converter():
+    """Conversor markdown2 pré-configurado, reutilizado entre reruns e sessões."""
+    return markdown2.Markdown(extras=list(MARKDOWN_EXTRAS)), threading.Lock()
+
+def get_theme_class(file_name):
+    if file_name.startswith("D1P2_"):
+        return "theme-d1p2"
+    if file_name.startswith("D2P1_"):
+        return "theme-d2p1"
+    if file_name.startswith("D2P2_"):
+        return "theme-d2p2"
+    if file_name.startswith("D3_") or file_name.startswith("R"):
+        return "theme-d3"
+    if file_name.startswith("D4_"):
+        return "theme-d4"
+    return "theme-d1p1"
+
+def render_dossier_html(content, sha, theme_class):
+    """Converte o dossiê para HTML, reaproveitando o resultado enquanto o blob não mudar."""
+    render_cache = get_render_cache()
+    key = (sha, theme_class, MARKDOWN_EXTRAS)
+    html = render_cache.get(key) if sha else None
+    if html is None:
+        converter, lock = get_markdown_converter()
+        with lock, get_metrics().timer("render.markdown"):
+            html_content = str(converter.convert(sanitize_text(content)))
+        html = f"<div class='dossier-viewer {theme_class}'>{html_content}</div>"
+        if sha:
+            render_cache.put(key, html)
+    return html
+
+# --- ÍNDICE DE BUSCA NO CONTEÚDO ---
+# Índice invertido (termo -> {caminho: frequência}) sobre o Markdown sanitizado.
+# A atualização é incremental pelo SHA dos blobs e o índice é salvo em disco.
+_FOLD_TABLE = {c: unicodedata.normalize("NFKD", chr(c))[0].lower() for c in range(0xC0, 0x250)}
+_TOKEN_RE = re.compile(r"\d+(?:-\d+)+|\w+")  # "4-3-3" vira um único termo
+SEARCH_STOPWORDS = frozenset(
+    "a o e é de da do das dos em no na nos nas um uma uns umas para por com sem que se ao aos "
+    "os as ou mas como mais sua seu suas seus pelo pela pelos pelas entre sobre foi ser são".split()
+)
+
+def fold_text(text: str) -> str:
+    """Minúsculas e sem acentos, preservando o comprimento (as posições servem aos trechos)."""
+    return text.translate(_FOLD_TABLE).lower()
+
+def tokenize(text: str) -> list:
+    return [t for t in _TOKEN_RE.findall(fold_text(text)) if t not in SEARCH_STOPWORDS and (len(t) > 1 or t.isdigit())]
+
+def make_snippet(text: str, query: str, width: int = 180) -> str:
+    """Trecho do texto em torno da primeira ocorrência dos termos buscados, com destaque."""
+    text = re.sub(r"[#*|>`_]+", " ", sanitize_text(text))
+    text = re.sub(r"\s+", " ", text).strip()
+    terms = sorted(set(tokenize(query)), key=len, reverse=True)
+    if not terms:
+        return text[:width]
+    pattern = re.compile(r"\b(?:" + "|".join(re.escape(t) for t in terms) + r")\b")
+    folded = fold_text(text)
+    first = pattern.search(folded)
+    start = max(0, first.start() - width // 3) if first else 0
+    end = min(len(text), start + width)
+    parts, last = [], start
+    for m in pattern.finditer(folded, start, end):
+        parts.append(text[last:m.start()])
+        parts.append(f"**{text[m.start():m.end()]}**")
+        last = m.end()
+    parts.append(text[last:end])
+    return ("…" if start > 0 else "") + "".join(parts) + ("…" if end < len(text) else "")
+
+class SearchIndex:
+    """Índice invertido com ranqueamento BM25, atualizado incrementalmente por SHA."""
+
+    VERSION = 1
+
+    def __init__(self):
+        self.snapshot_sha = None
+        self.docs = {}      # caminho -> {"sha": ..., "len": nº de termos, "terms": [...]}
+        self.postings = {}  # termo -> {caminho: frequência}
+        self.lock = threading.Lock()
+
+    def add(self, path, sha, text):
+        self.remove(path)
+        tokens = tokenize(sanitize_text(text))
+        freqs = {}
+        for token in tokens:
+            freqs[token] = freqs.get(token, 0) + 1
+        for term, tf in freqs.items():
+            self.postings.setdefault(term, {})[path] = tf
+        self.docs[path] = {"sha": sha, "len": len(tokens), "terms": list(freqs)}
+
+    def remove(self, path):
+        doc = self.docs.pop(path, None)
+        if doc is None:
+            return
+        for term in doc["terms"]:
+            postings = self.postings.get(term)
+            if postings is not None:
+                postings.pop(path, None)
+                if not postings:
+                    del self.postings[term]
+
+    def update(self, snapshot, fetch, progress=None, batch_size=200, can_fetch=None):
+        """Reindexa só os arquivos novos ou alterados no snapshot; retorna (quantos mudaram, falhas, adiados).
+
+        Os downloads acontecem fora de self.lock, que só é tomado para aplicar cada lote. Caminhos
+        recusados por can_fetch (ex.: saldo da API baixo) ficam adiados; o snapshot só é dado como
+        indexado se nada falhou nem foi adiado, senão a próxima busca continua de onde parou.
+        """
+        current = {f.path: f.sha for f in snapshot.iter_files()}
+        with self.lock:
+            removed = [p for p in self.docs if p not in current]
+            changed = [(p, sha) for p, sha in current.items() if self.docs.get(p, {}).get("sha") != sha]
+            for path in removed:
+                self.remove(path)
+        failed, deferred, batch = [], [], []
+        for i, (path, sha) in enumerate(changed, start=1):
+            if can_fetch is not None and not can_fetch(path, sha):
+                deferred.append(path)
+            else:
+                try:
+                    batch.append((path, sha, fetch(path, sha)))
+                except Exception as e:
+                    logger.warning("Falha ao indexar %s: %s", path, e)
+                    failed.append(path)
+            if len(batch) >= batch_size or i == len(changed):
+                with self.lock:
+                    for doc in batch:
+                        self.add(*doc)
+                batch = []
+            if progress:
+                progress(i, len(changed))
+        if not failed and not deferred:
+            with self.lock:
+                self.snapshot_sha = snapshot.sha
+        return len(removed) + len(changed) - len(failed) - len(deferred), failed, deferred
+
+    def search(self, query, limit=30, k1=1.2, b=0.75):
+        terms = set(tokenize(query))
+        if not terms or not self.docs:
+            return []
+        n_docs = len(self.docs)
+        avg_len = sum(d["len"] for d in self.docs.values()) / n_docs or 1
+        scores, matched = {}, {}
+        for term in terms:
+            postings = self.postings.get(term, {})
+            if not postings:
+                continue
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for path, tf in postings.items():
+                doc_len = self.docs[path]["len"]
+                scores[path] = scores.get(path, 0.0) + idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * doc_len / avg_len))
+                matched[path] = matched.get(path, 0) + 1
+        # Documentos que contêm todos os termos vêm primeiro
+        ranked = sorted(scores, key=lambda p: (matched[p], scores[p]), reverse=True)
+        return [(path, scores[path]) for path in ranked[:limit]]
+
+    def save(self, path):
+        with self.lock:
+            data = {"version": self.VERSION, "snapshot_sha": self.snapshot_sha, "docs": self.docs, "postings": self.postings}
+            payload = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as fh:
+            fh.write(payload)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        index = cls()
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as fh:
+                data = json.load(fh)
+            if data.get("version") == cls.VERSION:
+                index.snapshot_sha, index.docs, index.postings = data["snapshot_sha"], data["docs"], data["postings"]
+        except (OSError, ValueError):
+            pass
+        return index
+
+SEARCH_INDEX_PATH = os.path.join(CACHE_DIR, "search_index.json.gz")
+
+@st.cache_resource
+def get_search_index():
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    return SearchIndex.load(SEARCH_INDEX_PATH)
+
+# Só uma sessão indexa por vez; as demais esperam aqui, sem segurar o lock do índice
+# (que o ChangeFeed também usa ao invalidar caminhos).
+@st.cache_resource
+def get_search_build_lock():
+    return threading.Lock()
+
+def ensure_search_index(repo):
+    """Atualiza o índice de busca até o snapshot atual, com barra de progresso."""
+    snapshot = get_repo_snapshot(repo)
+    if snapshot is None:
+        st.warning("A busca no conteúdo precisa da árvore completa do repositório, que não pôde ser carregada.")
+        return None
+    index = get_search_index()
+    with get_search_build_lock():
+        if index.snapshot_sha != snapshot.sha:
+            progress_bar = st.progress(0.0, text="Atualizando índice de busca...")
+            def on_progress(done, total):
+                progress_bar.progress(done / total, text=f"Indexando dossiês... {done}/{total}")
+            # Mesmo piso do pré-carregamento: blobs fora do cache só são baixados enquanto
+            # sobrar saldo da API para as leituras e gravações dos usuários
+            blob_cache = get_blob_cache()
+            min_rate_remaining = int(get_setting("PREFETCH_MIN_RATE_REMAINING", 500))
+            def can_fetch(path, sha):
+                if sha in blob_cache:
+                    return True
+                rate = repo.rate_limit()
+                return rate is None or rate[0] >= min_rate_remaining
+            with get_metrics().timer("busca.indexacao"):
+                changed, failed, deferred = index.update(snapshot, lambda path, sha: fetch_blob(repo, path, sha), on_progress, can_fetch=can_fetch)
+            if changed:
+                index.save(SEARCH_INDEX_PATH)
+            progress_bar.empty()
+            if deferred:
+                st.warning(f"Saldo da API do GitHub baixo: {len(deferred)} dossiê(s) ficaram fora da busca por enquanto. A indexação continua nas próximas consultas, quando o limite for renovado.")
+            if failed:
+                st.warning(f"{len(failed)} dossiê(s) não puderam ser baixados e ficaram fora da busca; eles serão tentados de novo na próxima consulta.")
+    return index
+
+# --- PRÉ-CARREGAMENTO EM SEGUNDO PLANO ---
+# Ao abrir um dossiê, os vizinhos de pasta, as próximas rodadas e os briefings D4 da rodada
+# são baixados e renderizados num pool limitado; trocar de área cancela o que ainda não começou.
+PREFETCH_MAX_FILES = 40
+
+class Prefetcher:
+    """Pool de threads limitado que aquece os caches de blobs e de HTML."""
+
+    def __init__(self, max_workers, min_rate_remaining):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="painel-prefetch")
+        self.min_rate_remaining = min_rate_remaining
+        self._lock = threading.Lock()
+        self._areas = {}  # sessão -> (área, futures agendados)
+
+    def schedule(self, session_key, area, repo, entries):
+        with self._lock:
+            current = self._areas.get(session_key)
+            if current is not None and current[0] == area:
+                return
+            self._cancel_locked(session_key)
+            self._areas[session_key] = (area, self.warm(repo, entries))
+            if len(self._areas) > 100:
+                for key in [k for k, (_, fs) in self._areas.items() if all(f.done() for f in fs)]:
+                    del self._areas[key]
+
+    def warm(self, repo, entries):
+        blob_cache = get_blob_cache()
+        return [self.executor.submit(self._warm, repo, entry) for entry in entries if entry.sha not in blob_cache]
+
+    def cancel(self, session_key):
+        with self._lock:
+            self._cancel_locked(session_key)
+
+    def _cancel_locked(self, session_key):
+        _, futures = self._areas.pop(session_key, (None, []))
+        for future in futures:
+            future.cancel()  # só cancela o que ainda está na fila
+
+    def _warm(self, repo, entry):
+        rate = repo.rate_limit()
+        if rate is not None and rate[0] < self.min_rate_remaining:
+            return  # reserva o saldo da API para as ações do usuário
+        try:
+            content = fetch_blob(repo, entry.path, entry.sha)
+            render_dossier_html(content, entry.sha, get_theme_class(entry.name))
+        except Exception as e:
+            logger.info("Pré-carregamento de %s falhou: %s", entry.path, e)
+
+@st.cache_resource
+def get_prefetcher():
+    return Prefetcher(int(get_setting("PREFETCH_WORKERS", 4)), int(get_setting("PREFETCH_MIN_RATE_REMAINING", 500)))
+
+def prefetch_candidates(snapshot, path):
+    """Dossiês que costumam ser abertos em seguida: mesma pasta, próximas rodadas e briefings D4."""
+    folder = os.path.dirname(path)
+    candidates = [f for f in snapshot.list_dir(folder)[1] if f.path != path]
+    parts = folder.split("/")
+    round_match = _ROUND_DIR_RE.match(parts[-1]) if len(parts) >= 5 and parts[-2] == "Rodadas" else None
+    if round_match:
+        n = int(round_match.group(1))
+        rounds_dir = "/".join(parts[:-1])
+        for k in (n + 1, n + 2):
+            candidates += snapshot.list_dir(f"{rounds_dir}/R{k}")[1]
+        season_dir = "/".join(parts[:3])
+        for club_dir in snapshot.list_dir(season_dir)[0]:
+            for k in (n, n + 1):
+                candidates += [f for f in snapshot.list_dir(f"{club_dir.path}/Rodadas/R{k}")[1] if f.name.startswith("D4_") and f.path != path]
+    return candidates[:PREFETCH_MAX_FILES]
+
+def get_session_key():
+    return st.session_state.setdefault("prefetch_session", uuid.uuid4().hex)
+
+def prefetch_around(repo, path):
+    snapshot = get_repo_snapshot(repo)
+    if snapshot is not None:
+        get_prefetcher().schedule(get_session_key(), os.path.dirname(path), repo, prefetch_candidates(snapshot, path))
+
+@st.cache_resource
+def start_warmup(_repo):
+    """Aquece, uma vez por processo, os PREFETCH_WARMUP dossiês alterados mais recentemente."""
+    limit = int(get_setting("PREFETCH_WARMUP", 0))
+    snapshot = get_repo_snapshot(_repo)
+    if not limit or snapshot is None:
+        return False
+    prefetcher = get_prefetcher()
+    def warmup():
+        try:
+            entries = [snapshot.get_entry(path) for path in _repo.recent_paths(limit)]
+        except Exception as e:
+            logger.info("Aquecimento inicial indisponível: %s", e)
+            return
+        prefetcher.warm(_repo, [e for e in entries if e is not None])
+    prefetcher.executor.submit(warmup)
+    return True
+
+def open_dossier(repo, path, name, sha):
+    if get_dossier_text(repo, path, sha) is not None:
+        st.session_state["viewing_file"] = {"path": path, "name": name, "sha": sha}
+        prefetch_around(repo, path)
+
+def display_content_search(repo):
+    query = st.text_input("Buscar no conteúdo...", label_visibility="collapsed", placeholder="Buscar jogador, formação, adversário...", key="content_query")
+    if not query:
+        return
+    index = ensure_search_index(repo)
+    if index is None:
+        return
+    with index.lock, get_metrics().timer("busca.consulta"):
+        results = [(path, index.docs[path]["sha"]) for path, _ in index.search(query)]
+    if not results:
+        st.info("Nenhum dossiê encontrado.")
+        return
+    st.caption(f"{len(results)} resultado(s)")
+    for path, sha in results:
+        if st.button(f"📄 {os.path.basename(path)}", key=f"search_{path}", use_container_width=True):
+            open_dossier(repo, path, os.path.basename(path), sha)
+        text = get_blob_cache().get(sha)
+        snippet = make_snippet(text.decode("utf-8"), query) if text is not None else ""
+        st.caption(f"📁 {os.path.dirname(path)}  \n{snippet}")
+
+# --- ÍNDICE DE METADADOS (FACETAS) ---
+# Os campos que save_dossier codifica em caminhos e nomes viram colunas compactas (códigos
+# inteiros por valor distinto) com listas de linhas por valor; filtrar é intersectar listas.
+_DOSSIER_TYPE_RE = re.compile(r"^(D1P1|D1P2|D2P1|D2P2|D3|D4)_")
+_MATCH_NAME_RE = re.compile(r"^(?:D3_PosRodada|D4_Briefing)_(?P<casa>.+)_vs_(?P<visitante>.+)$")
+
+def parse_dossier_metadata(path):
+    """Campos de metadados de um dossiê a partir do caminho e do nome do arquivo."""
+    parts = path.split("/")
+    stem = os.path.splitext(parts[-1])[0]
+    folders = parts[:-1]
+    type_match = _DOSSIER_TYPE_RE.match(stem)
+    tipo = type_match.group(1) if type_match else "Outro"
+    fields = {"tipo": tipo, "pais": "", "liga": "", "temporada": "", "clube": "", "casa": "", "visitante": ""}
+    if len(folders) >= 3:
+        fields.update(pais=folders[0], liga=folders[1], temporada=folders[2])
+    if tipo in ("D2P1", "D2P2", "D4") and len(folders) >= 4:
+        fields["clube"] = folders[3]
+    match = _MATCH_NAME_RE.match(stem)
+    if match:
+        fields.update(casa=match.group("casa"), visitante=match.group("visitante"))
+    rodada = -1
+    for folder in folders:
+        round_match = _ROUND_DIR_RE.match(folder)
+        if round_match:
+            rodada = int(round_match.group(1))
+    return fields, rodada
+
+class FacetIndex:
+    """Colunas de metadados dos dossiês de um snapshot, com filtros e ordenação em memória."""
+
+    COLUMNS = ("tipo", "pais", "liga", "temporada", "clube", "casa", "visitante")
+
+    def __init__(self, snapshot):
+        self.entries = []
+        self.values = {col: [""] for col in self.COLUMNS}  # código -> valor (0 = vazio)
+        self.codes = {col: array("I") for col in self.COLUMNS}
+        self.rows_by_code = {col: {} for col in self.COLUMNS}
+        self.rodada = array("i")
+        lookup = {col: {"": 0} for col in self.COLUMNS}
+        for entry in snapshot.iter_files():
+            row = len(self.entries)
+            fields, rodada = parse_dossier_metadata(entry.path)
+            self.entries.append(entry)
+            self.rodada.append(rodada)
+            for col in self.COLUMNS:
+                code = lookup[col].get(fields[col])
+                if code is None:
+                    code = lookup[col][fields[col]] = len(self.values[col])
+                    self.values[col].append(fields[col])
+                self.codes[col].append(code)
+                self.rows_by_code[col].setdefault(code, array("I")).append(row)
+
+    def options(self, col):
+        """Valores distintos da coluna com a contagem de dossiês, em ordem."""
+        return sorted((value, len(self.rows_by_code[col].get(code, ()))) for code, value in enumerate(self.values[col]) if value)
+
+    def club_options(self):
+        clubs = set()
+        for col in ("clube", "casa", "visitante"):
+            clubs.update(v for v in self.values[col] if v)
+        return sorted(clubs)
+
+    def _rows_for(self, col, values):
+        rows = set()
+        for code, value in enumerate(self.values[col]):
+            if value in values:
+                rows.update(self.rows_by_code[col].get(code, ()))
+        return rows
+
+    def query(self, filters=None, club=None, sort_by="rodada", descending=False, latest_per_club=False):
+        """Dossiês que atendem a todos os filtros {coluna: valores}; club casa com clube, casa ou visitante."""
+        candidate_sets = [self._rows_for(col, set(values)) for col, values in (filters or {}).items() if values]
+        if club:
+            candidate_sets.append(set().union(*(self._rows_for(col, {club}) for col in ("clube", "casa", "visitante"))))
+        if candidate_sets:
+            rows = set.intersection(*sorted(candidate_sets, key=len))
+        else:
+            rows = set(range(len(self.entries)))
+        if latest_per_club:
+            latest = {}
+            for row in rows:
+                # D2/D4 contam para o clube da pasta; D3 para mandante e visitante; D1 não tem clube
+                clubs = (self.value("clube", row),) if self.codes["clube"][row] else (self.value("casa", row), self.value("visitante", row))
+                for name in clubs:
+                    if not name or (club and name != club):
+                        continue
+                    if name not in latest or self._latest_key(row) > self._latest_key(latest[name]):
+                        latest[name] = row
+            rows = set(latest.values())
+        return [self.entries[row] for row in sorted(rows, key=lambda r: self._sort_key(r, sort_by), reverse=descending)]
+
+    def value(self, col, row):
+        return self.values[col][self.codes[col][row]]
+
+    def _recency(self, row):
+        return (self.value("temporada", row), self.rodada[row])
+
+    def _latest_key(self, row):
+        return (*self._recency(row), self.entries[row].path)
+
+    def _sort_key(self, row, sort_by):
+        if sort_by == "rodada":
+            return (self.rodada[row], self.entries[row].name)
+        if sort_by == "temporada":
+            return (*self._recency(row), self.entries[row].name)
+        if sort_by == "nome":
+            return (self.entries[row].name,)
+        return (self.value(sort_by, row), self.entries[row].name)
+
+FACET_SORT_OPTIONS = {"Rodada": "rodada", "Temporada": "temporada", "Tipo": "tipo", "Clube": "clube", "Nome": "nome"}
+
+def display_facet_filters(repo):
+    snapshot = get_repo_snapshot(repo)
+    if snapshot is None:
+        st.warning("Os filtros precisam da árvore completa do repositório, que não pôde ser carregada.")
+        return
+    facets = snapshot.facets
+    filters = {}
+    c1, c2 = st.columns(2)
+    for column, (col, label) in zip([c1, c2, c1, c2], [("tipo", "Tipo"), ("pais", "País"), ("liga", "Liga"), ("temporada", "Temporada")]):
+        counts = dict(facets.options(col))
+        filters[col] = column.multiselect(label, list(counts), format_func=lambda v, counts=counts: f"{v} ({counts[v]})", key=f"facet_{col}")
+    club = st.selectbox("Clube", [""] + facets.club_options(), key="facet_club", format_func=lambda v: v or "Todos os clubes")
+    c1, c2 = st.columns(2)
+    sort_label = c1.selectbox("Ordenar por", list(FACET_SORT_OPTIONS), key="facet_sort")
+    descending = c2.toggle("Decrescente", key="facet_desc")
+    latest_per_club = st.checkbox("Apenas o mais recente de cada clube", key="facet_latest")
+    with get_metrics().timer("facetas.consulta"):
+        results = facets.query(filters, club or None, FACET_SORT_OPTIONS[sort_label], descending, latest_per_club)
+    st.caption(f"{len(results)} dossiê(s)")
+    st.divider()
+    page = st.session_state.get("facet_page", 0)
+    n_pages = max(1, math.ceil(len(results) / NAV_PAGE_SIZE))
+    page = min(page, n_pages - 1)
+    for entry in results[page * NAV_PAGE_SIZE:(page + 1) * NAV_PAGE_SIZE]:
+        display_file_row(repo, entry)
+    if n_pages > 1:
+        prev_col, info_col, next_col = st.columns([0.2, 0.6, 0.2])
+        prev_col.button("◀", key="facet_prev", disabled=page == 0, on_click=st.session_state.__setitem__, args=("facet_page", page - 1))
+        info_col.caption(f"Página {page + 1} de {n_pages}")
+        next_col.button("▶", key="facet_next", disabled=page >= n_pages - 1, on_click=st.session_state.__setitem__, args=("facet_page", page + 1))
+
 def check_password():
     if st.session_state.get("password_correct", False):
         return True
@@ -148,215 +1549,649 @@ def check_password():
                     if password == st.secrets.get("APP_PASSWORD"):
                         st.session_state["password_correct"] = True
                         st.rerun()
+                    elif get_setting("ADMIN_PASSWORD") and password == get_setting("ADMIN_PASSWORD"):
+                        st.session_state.update(password_correct=True, is_admin=True)
+                        st.rerun()
                     else:
                         st.error("Senha incorreta.")
     return False
 
+def filter_entries(repo, dirs, files):
+    """Aplica o filtro por nome de arquivo; pastas sem nenhum arquivo correspondente somem."""
+    search_term = st.session_state.get("search_term", "")
+    if search_term:
+        files = [f for f in files if search_term.lower() in f.name.lower()]
+        snapshot = get_repo_snapshot(repo)
+        if snapshot is not None:
+            matching_dirs = snapshot.dirs_matching(search_term)
+            dirs = [d for d in dirs if d.path in matching_dirs]
+    return dirs, files
+
+def display_file_row(repo, content_file, indent=""):
+    col1, col2, col3 = st.columns([0.7, 0.15, 0.15])
+    with col1:
+        if st.button(f"{indent}📄 {content_file.name}", key=f"view_{content_file.path}", use_container_width=not indent):
+            open_dossier(repo, content_file.path, content_file.name, content_file.sha)
+    with col2:
+        if st.button("✏️", key=f"edit_{content_file.path}", help="Editar Dossiê"):
+            st.warning("Função de edição em desenvolvimento.")
+    with col3:
+        if st.button("🗑️", key=f"delete_{content_file.path}", help="Excluir Dossiê"):
+            st.session_state['file_to_delete'] = {'path': content_file.path, 'sha': content_file.sha}
+            st.rerun()
+    if st.session_state.get('file_to_delete', {}).get('path') == content_file.path:
+        st.warning(f"Excluir {content_file.path}?")
+        btn_c1, btn_c2 = st.columns(2)
+        if btn_c1.button("Sim, excluir!", key=f"confirm_del_{content_file.path}", type="primary"):
+            file_info = st.session_state.pop('file_to_delete')
+            commit = repo.delete_file(file_info['path'], f"Exclui {file_info['path']}", file_info['sha'])
+            record_write(commit, {file_info['path']: None})
+            if st.session_state.get('viewing_file', {}).get('path') == file_info['path']:
+                st.session_state.pop('viewing_file', None)
+            st.success(f"Arquivo '{file_info['path']}' excluído.")
+            st.rerun()
+        if btn_c2.button("Cancelar", key=f"cancel_del_{content_file.path}"):
+            st.session_state.pop('file_to_delete')
+            st.rerun()
+
 def display_repo_structure(repo, path=""):
     try:
-        # ALTERAÇÃO: Usa a função com cache para listar arquivos e diretórios
-        dirs, files = list_repo_contents(repo, path)
-        
-        search_term = st.session_state.get("search_term", "")
-        if search_term:
-            files = [f for f in files if search_term.lower() in f.name.lower()]
+        # ALTERAÇÃO: Lista a partir do snapshot da árvore (sem chamada à API por pasta)
+        dirs, files = filter_entries(repo, *list_dir(repo, path))
         for content_dir in dirs:
             with st.expander(f"📁 {content_dir.name}"):
                 display_repo_structure(repo, content_dir.path)
         for content_file in files:
-            col1, col2, col3 = st.columns([0.7, 0.15, 0.15])
-            with col1:
-                if st.button(f"📄 {content_file.name}", key=f"view_{content_file.path}", use_container_width=True):
-                    file_content = get_file_content(repo, content_file.path)
-                    if file_content:
-                        st.session_state.update(viewing_file_content=file_content, viewing_file_name=content_file.name)
-            with col2:
-                if st.button("✏️", key=f"edit_{content_file.path}", help="Editar Dossiê"):
-                    st.warning("Função de edição em desenvolvimento.")
-            with col3:
-                if st.button("🗑️", key=f"delete_{content_file.path}", help="Excluir Dossiê"):
-                    st.session_state['file_to_delete'] = {'path': content_file.path, 'sha': content_file.sha}
-                    st.rerun()
-            if st.session_state.get('file_to_delete', {}).get('path') == content_file.path:
-                st.warning(f"Excluir {content_file.path}?")
-                btn_c1, btn_c2 = st.columns(2)
-                if btn_c1.button("Sim, excluir!", key=f"confirm_del_{content_file.path}", type="primary"):
-                    file_info = st.session_state.pop('file_to_delete')
-                    repo.delete_file(file_info['path'], f"Exclui {file_info['path']}", file_info['sha'])
-                    if st.session_state.get('viewing_file_name') == os.path.basename(file_info['path']):
-                        st.session_state.pop('viewing_file_content', None)
-                        st.session_state.pop('viewing_file_name', None)
-                    st.success(f"Arquivo '{file_info['path']}' excluído.")
-                    st.rerun()
-                if btn_c2.button("Cancelar", key=f"cancel_del_{content_file.path}"):
-                    st.session_state.pop('file_to_delete')
-                    st.rerun()
+            display_file_row(repo, content_file)
+    except Exception as e:
+        st.error(f"Erro ao exibir a estrutura de arquivos: {e}")
+
+# --- NAVEGADOR LEVE ---
+# st.expander executa o corpo mesmo fechado; aqui só os nós expandidos são construídos
+# e pastas grandes são listadas em páginas, então o custo do rerun depende do que está visível.
+NAV_PAGE_SIZE = 50
+
+def display_lazy_navigator(repo, path="", depth=0):
+    try:
+        dirs, files = filter_entries(repo, *list_dir(repo, path))
+        expanded = st.session_state.setdefault("nav_expanded", set())
+        pages = st.session_state.setdefault("nav_pages", {})
+        entries = dirs + files
+        n_pages = max(1, math.ceil(len(entries) / NAV_PAGE_SIZE))
+        page = min(pages.get(path, 0), n_pages - 1)
+        indent = "\u3000" * depth
+        for entry in entries[page * NAV_PAGE_SIZE:(page + 1) * NAV_PAGE_SIZE]:
+            if entry.type == 'dir':
+                is_open = entry.path in expanded
+                st.button(f"{indent}{'📂' if is_open else '📁'} {entry.name}", key=f"dir_{entry.path}",
+                          on_click=expanded.symmetric_difference_update, args=({entry.path},))
+                if is_open:
+                    display_lazy_navigator(repo, entry.path, depth + 1)
+            else:
+                display_file_row(repo, entry, indent)
+        if n_pages > 1:
+            prev_col, info_col, next_col = st.columns([0.2, 0.6, 0.2])
+            prev_col.button("◀", key=f"nav_prev_{path}", disabled=page == 0, on_click=pages.__setitem__, args=(path, page - 1))
+            info_col.caption(f"{indent}{path or 'Raiz'}: página {page + 1} de {n_pages} ({len(entries)} itens)")
+            next_col.button("▶", key=f"nav_next_{path}", disabled=page >= n_pages - 1, on_click=pages.__setitem__, args=(path, page + 1))
     except Exception as e:
         st.error(f"Erro ao exibir a estrutura de arquivos: {e}")
 
+def build_dossier_path(file_name_template: str, path_parts: list, fields: dict) -> str:
+    format_dict = {k: v.replace(' ', '_').replace('/', '-') for k, v in fields.items()}
+    file_name = file_name_template.format(**format_dict) + ".md"
+    final_path_parts = [p.replace(" ", "_") for p in path_parts]
+    return "/".join(final_path_parts) + "/" + file_name
+
 def save_dossier(repo, file_name_template: str, path_parts: list, content: str, required_fields: dict):
     if not all(required_fields.values()):
         st.error("Todos os campos marcados com * são obrigatórios.")
         return
-    format_dict = {k: v.replace(' ', '_').replace('/', '-') for k, v in required_fields.items()}
-    file_name = file_name_template.format(**format_dict) + ".md"
-    final_path_parts = [p.replace(" ", "_") for p in path_parts]
-    full_path = "/".join(final_path_parts) + "/" + file_name
+    full_path = build_dossier_path(file_name_template, path_parts, required_fields)
+    file_name = os.path.basename(full_path)
     commit_message = f"Adiciona: {file_name}"
     with st.spinner("Salvando dossiê..."):
         try:
-            repo.create_file(full_path, commit_message, content)
+            commit = repo.create_file(full_path, commit_message, content)
             st.success(f"Dossiê '{full_path}' salvo com sucesso!")
-            # Limpa o cache da listagem de arquivos para refletir o novo arquivo
-            list_repo_contents.clear()
+            # Atualiza só a pasta do novo arquivo (snapshot, listagem e índice de busca)
+            record_write(commit, {full_path: git_blob_sha(content.encode("utf-8"))})
+            st.session_state.pop("ocr_markdown", None)
         except Exception as e:
             st.error(f"Ocorreu um erro ao salvar: {e}")
             st.info("Verifique se um arquivo com este nome já não existe.")
 
+# --- IMPORTAÇÃO EM LOTE ---
+# Os nomes gerados pelos templates de save_dossier são lidos de volta para reconstruir o
+# caminho pais/liga/temporada/...; o lote inteiro vira uma única árvore e um único commit.
+IMPORT_TEMPLATES = [
+    (re.compile(r"^D1P1_Analise_Liga_(?P<liga>.+)_(?P<pais>[^_]+)$"), "D1P1_Analise_Liga_{liga}_{pais}", ["pais", "liga", "temporada"]),
+    (re.compile(r"^D1P2_Clubes_Dominantes_(?P<liga>.+)_(?P<pais>[^_]+)$"), "D1P2_Clubes_Dominantes_{liga}_{pais}", ["pais", "liga", "temporada"]),
+    (re.compile(r"^D2P1_Planteis_(?P<clube>.+)_(?P<temporada>[^_]+)$"), "D2P1_Planteis_{clube}_{temporada}", ["pais", "liga", "temporada", "clube"]),
+    (re.compile(r"^D2P2_Estudo_Tatico_(?P<clube>.+)_(?P<temporada>[^_]+)$"), "D2P2_Estudo_Tatico_{clube}_{temporada}", ["pais", "liga", "temporada", "clube"]),
+    (re.compile(r"^D3_PosRodada_(?P<time_casa>.+)_vs_(?P<time_visitante>.+)$"), "D3_PosRodada_{time_casa}_vs_{time_visitante}", ["pais", "liga", "temporada", "Rodadas", "R{rodada}"]),
+    (re.compile(r"^D4_Briefing_(?P<nosso_clube>.+)_vs_(?P<adversario>.+)$"), "D4_Briefing_{nosso_clube}_vs_{adversario}", ["pais", "liga", "temporada", "nosso_clube", "Rodadas", "R{rodada}"]),
+]
+_ROUND_DIR_RE = re.compile(r"^R(\d+)$")
+_TEMPLATE_TAIL_RE = re.compile(r"\{(\w+)\}([^{}]+)\{(\w+)\}$")
+# Temporadas nunca têm "_" (ex.: 2025, 2024-25), então a divisão do nome antes delas é segura
+_SINGLE_TOKEN_FIELDS = {"temporada"}
+# Campos que o formulário da importação em lote oferece (ver display_bulk_import)
+_BULK_FORM_FIELDS = ("pais", "liga", "temporada", "rodada")
+_FIELD_LABELS = {"pais": "País", "liga": "Liga", "temporada": "Temporada", "clube": "Clube", "time_casa": "Time da Casa", "time_visitante": "Time Visitante", "nosso_clube": "Nosso Clube", "adversario": "Adversário"}
+
+def _name_slug(value: str) -> str:
+    return value.replace(' ', '_').replace('/', '-')
+
+def _resolve_name_fields(fields: dict, template: str, defaults: dict):
+    """Divide o fim do nome (ex.: {liga}_{pais}) usando os valores do formulário; retorna o erro, se houver."""
+    first, sep, second = _TEMPLATE_TAIL_RE.search(template).groups()
+    tail = f"{fields[first]}{sep}{fields[second]}"
+    given_first, given_second = defaults.get(first), defaults.get(second)
+    if given_first and given_second:
+        ok = tail == f"{_name_slug(given_first)}{sep}{_name_slug(given_second)}"
+    elif given_second:
+        suffix = f"{sep}{_name_slug(given_second)}"
+        ok = tail.endswith(suffix) and len(tail) > len(suffix)
+        given_first = tail[:-len(suffix)]
+    elif given_first:
+        prefix = f"{_name_slug(given_first)}{sep}"
+        ok = tail.startswith(prefix) and len(tail) > len(prefix)
+        given_second = tail[len(prefix):]
+    else:
+        if tail.count(sep) > 1 and second not in _SINGLE_TOKEN_FIELDS:
+            on_form = [_FIELD_LABELS[f] for f in (first, second) if f in _BULK_FORM_FIELDS]
+            if on_form:
+                return f"Nome ambíguo ({tail}): informe {' ou '.join(on_form)} no formulário"
+            return f"Nome ambíguo ({tail}): renomeie o arquivo ou envie um ZIP com 'Usar as pastas do ZIP como caminho de destino'"
+        return None
+    if not ok:
+        return f"Nome não confere com {_FIELD_LABELS[first]}/{_FIELD_LABELS[second]} do formulário"
+    fields.update({first: given_first, second: given_second})
+    return None
+
+def infer_dossier_path(member_path: str, defaults: dict):
+    """Caminho de destino de um arquivo importado a partir do nome; retorna (caminho, erro)."""
+    stem = os.path.splitext(os.path.basename(member_path))[0]
+    for pattern, template, parts in IMPORT_TEMPLATES:
+        match = pattern.match(stem)
+        if not match:
+            continue
+        # Os valores do formulário prevalecem, desde que o nome termine com eles; depois completam o que falta
+        fields = match.groupdict()
+        error = _resolve_name_fields(fields, template, defaults)
+        if error:
+            return None, error
+        for key, value in defaults.items():
+            if value:
+                fields.setdefault(key, value)
+        for folder in os.path.dirname(member_path).split("/"):
+            round_match = _ROUND_DIR_RE.match(folder)
+            if round_match:
+                fields["rodada"] = round_match.group(1)
+        needed = [p for p in parts if p != "Rodadas"]
+        missing = ["rodada" if p == "R{rodada}" else p for p in needed if not fields.get("rodada" if p == "R{rodada}" else p)]
+        if missing:
+            return None, f"Campos ausentes: {', '.join(missing)}"
+        path_parts = []
+        for part in parts:
+            if part == "Rodadas":
+                path_parts.append(part)
+            elif part == "R{rodada}":
+                path_parts.append(f"R{fields['rodada']}")
+            else:
+                path_parts.append(fields[part])
+        name_fields = {k: fields[k] for k in re.findall(r"{(\w+)}", template)}
+        return build_dossier_path(template, path_parts, name_fields), None
+    return None, "Nome fora dos padrões D1P1…D4"
+
+def read_import_files(uploaded_files):
+    """Extrai (caminho de origem, bytes) dos .md enviados, abrindo ZIPs."""
+    items = []
+    for uploaded in uploaded_files:
+        if uploaded.name.lower().endswith(".zip"):
+            with zipfile.ZipFile(io.BytesIO(uploaded.getvalue())) as archive:
+                for info in archive.infolist():
+                    if not info.is_dir() and info.filename.lower().endswith(".md") and not info.filename.startswith("__MACOSX/"):
+                        items.append((info.filename, archive.read(info)))
+        else:
+            items.append((uploaded.name, uploaded.getvalue()))
+    return items
+
+def _target_exists(repo, snapshot, target, listings):
+    """Se o destino já existe no HEAD; sem snapshot, consulta o backend pasta a pasta (fora do cache de listagem)."""
+    if snapshot is not None:
+        return snapshot.get_entry(target) is not None
+    folder = os.path.dirname(target)
+    if folder not in listings:
+        try:
+            listings[folder] = {f.name for f in repo.list_dir(folder)[1]}
+        except UnknownObjectException:
+            listings[folder] = set()  # pasta ainda não existe no GitHub
+    return os.path.basename(target) in listings[folder]
+
+def plan_import(repo, items, defaults, keep_zip_paths):
+    """Valida o lote inteiro antes de qualquer escrita; retorna linhas de relatório e arquivos válidos."""
+    snapshot = get_repo_snapshot(repo)
+    listings = {}
+    rows, files = [], {}
+    for source, data in items:
+        target, error = (source.strip("/"), None) if keep_zip_paths and "/" in source else infer_dossier_path(source, defaults)
+        content = None
+        if error is None:
+            try:
+                content = data.decode("utf-8-sig")
+            except UnicodeDecodeError:
+                error = "Arquivo não está em UTF-8"
+        if error is None and not content.strip():
+            error = "Arquivo vazio"
+        if error is None and target in files:
+            error = "Destino repetido no lote"
+        if error is None:
+            try:
+                if _target_exists(repo, snapshot, target, listings):
+                    error = "Já existe no repositório"
+            except Exception as e:
+                error = f"Não foi possível verificar se já existe: {e}"
+        if error is None:
+            files[target] = content
+        rows.append({"Arquivo": source, "Destino": target or "", "Situação": error or "OK"})
+    return rows, files
+
+def display_bulk_import(repo):
+    st.subheader("Importação em Lote")
+    st.caption("Envie um ZIP ou vários arquivos .md com os nomes gerados pelos templates (ex.: D3_PosRodada_Casa_vs_Visitante.md). Para países ou ligas com mais de uma palavra, informe-os abaixo.")
+    uploaded_files = st.file_uploader("Arquivos", type=["md", "zip"], accept_multiple_files=True, key="bulk_import_files")
+    c1, c2, c3, c4 = st.columns(4)
+    defaults = {
+        "pais": c1.text_input("País", key="bulk_pais"),
+        "liga": c2.text_input("Liga", key="bulk_liga"),
+        "temporada": c3.text_input("Temporada", key="bulk_temporada"),
+        "rodada": c4.text_input("Rodada", key="bulk_rodada", placeholder="Ou pasta R{n} no ZIP"),
+    }
+    keep_zip_paths = st.checkbox("Usar as pastas do ZIP como caminho de destino", key="bulk_keep_paths")
+    if not uploaded_files:
+        return
+    try:
+        items = read_import_files(uploaded_files)
+    except zipfile.BadZipFile as e:
+        st.error(f"ZIP inválido: {e}")
+        return
+    rows, files = plan_import(repo, items, defaults, keep_zip_paths)
+    st.dataframe(rows, use_container_width=True, hide_index=True)
+    errors = len(rows) - len(files)
+    if errors:
+        st.error(f"{errors} arquivo(s) com problema. Corrija antes de importar.")
+        return
+    commit_message = st.text_input("Mensagem do commit", value=f"Importa {len(files)} dossiês", key="bulk_commit_message")
+    if st.button(f"Importar {len(files)} dossiê(s) em um commit", type="primary"):
+        progress_bar = st.progress(0.0, text="Enviando dossiês...")
+        def on_progress(done, total):
+            progress_bar.progress(done / total, text=f"Enviando dossiês... {done}/{total}")
+        try:
+            commit = repo.commit_files(files, commit_message, progress=on_progress)
+            record_write(commit, {path: git_blob_sha(content.encode("utf-8")) for path, content in files.items()})
+            progress_bar.empty()
+            st.success(f"{len(files)} dossiê(s) importado(s) no commit {commit.sha[:7]}.")
+        except Exception as e:
+            st.error(f"Ocorreu um erro na importação: {e}")
+
+# --- OCR ---
+# Imagens e PDFs escaneados viram Markdown para os templates de save_dossier. Cada página é
+# lida por um processo tesseract próprio (as threads do pool só aguardam o subprocesso), e o
+# texto fica no cache em disco pelo hash da imagem: reenviar o mesmo arquivo não refaz o OCR.
+OCR_IMAGE_TYPES = ["png", "jpg", "jpeg", "tif", "tiff", "bmp", "webp"]
+
+@st.cache_resource
+def get_ocr_pool():
+    # Uma thread OpenMP por tesseract: o paralelismo vem das páginas simultâneas
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+    workers = int(get_setting("OCR_WORKERS", os.cpu_count() or 2))
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="painel-ocr")
+
+@st.cache_resource
+def get_ocr_cache():
+    max_mb = int(get_setting("PAINEL_OCR_CACHE_MB", 32))
+    return BlobCache(os.path.join(CACHE_DIR, "ocr"), max_mb * 1024 * 1024)
+
+def open_ocr_pages(file_name, data, dpi):
+    """Número de páginas e iterador das páginas em tons de cinza; PDFs são rasterizados sob demanda."""
+    if file_name.lower().endswith(".pdf"):
+        if pdfium is None:
+            raise RuntimeError("pypdfium2 não está instalado; não é possível ler PDFs.")
+        pdf = pdfium.PdfDocument(data)
+
+        def pages():
+            try:
+                for index in range(len(pdf)):
+                    page = pdf[index]
+                    yield page.render(scale=dpi / 72, grayscale=True).to_pil().convert("L")
+                    page.close()
+            finally:
+                pdf.close()
+        return len(pdf), pages()
+    image = Image.open(io.BytesIO(data))
+    # TIFFs podem ter várias páginas
+    return getattr(image, "n_frames", 1), (frame.convert("L") for frame in ImageSequence.Iterator(image))
+
+def run_ocr(file_name, data, on_progress=None):
+    """Texto de cada página de uma imagem ou PDF, com as páginas lidas em paralelo."""
+    lang = get_setting("OCR_LANG", "por+eng")
+    dpi = int(get_setting("OCR_DPI", 300))
+    cache = get_ocr_cache()
+    file_key = hashlib.sha256(f"{lang}:{dpi}:".encode("utf-8") + data).hexdigest()
+    cached = cache.get(file_key)
+    if cached is not None:
+        get_metrics().incr("ocr.cache_arquivo")
+        return json.loads(cached)
+
+    total, pages = open_ocr_pages(file_name, data, dpi)
+    texts = [None] * total
+    pending = {}
+    done = 0
+
+    def collect(future):
+        nonlocal done
+        index, page_key = pending.pop(future)
+        texts[index] = future.result()
+        cache.put(page_key, texts[index].encode("utf-8"))
+        done += 1
+        if on_progress:
+            on_progress(done, total)
+
+    pool = get_ocr_pool()
+    # A rasterização fica nesta thread (o pdfium não é thread-safe) e cada página segue para
+    # o pool assim que fica pronta, sobrepondo a renderização da próxima com o OCR da anterior
+    for index, image in enumerate(pages):
+        page_key = hashlib.sha256(f"{lang}:{image.size}:".encode("utf-8") + image.tobytes()).hexdigest()
+        hit = cache.get(page_key)
+        if hit is not None:
+            get_metrics().incr("ocr.cache_pagina")
+            texts[index] = hit.decode("utf-8")
+            done += 1
+            if on_progress:
+                on_progress(done, total)
+            continue
+        pending[pool.submit(pytesseract.image_to_string, image, lang=lang)] = (index, page_key)
+        for future in [f for f in pending if f.done()]:
+            collect(future)
+    for future in as_completed(list(pending)):
+        collect(future)
+
+    cache.put(file_key, json.dumps(texts).encode("utf-8"))
+    return texts
+
+def ocr_to_markdown(texts):
+    """Markdown a partir dos textos por página, no formato do campo de conteúdo dos templates."""
+    pages = []
+    for number, text in enumerate(texts, start=1):
+        text = re.sub(r"(\w)-\n(\w)", r"\1\2", text)  # palavras hifenizadas na quebra de linha
+        text = re.sub(r"[ \t]+\n", "\n", text)
+        text = re.sub(r"\n{3,}", "\n\n", text).strip()
+        pages.append(f"## Página {number}\n\n{text}" if len(texts) > 1 else text)
+    return "\n\n".join(pages)
+
+def display_ocr_ingest(key):
+    """Envio de imagens e PDFs escaneados; o texto extraído preenche o conteúdo dos templates."""
+    if pytesseract is None:
+        st.warning("OCR indisponível: instale as dependências pytesseract e pypdfium2.")
+        return
+    uploaded_files = st.file_uploader("Imagens ou PDF escaneado", type=OCR_IMAGE_TYPES + ["pdf"], accept_multiple_files=True, key=f"{key}_files")
+    if uploaded_files and st.button("Extrair texto", key=f"{key}_run", type="primary"):
+        progress = st.progress(0.0, text="Preparando OCR...")
+        parts = []
+        try:
+            for uploaded_file in uploaded_files:
+                def report(done, total, name=uploaded_file.name):
+                    progress.progress(done / total, text=f"{name}: página {done} de {total}")
+                with get_metrics().timer("ocr.arquivo"):
+                    texts = run_ocr(uploaded_file.name, uploaded_file.getvalue(), report)
+                parts.append(ocr_to_markdown(texts))
+        except Exception as e:
+            st.error(f"Erro ao extrair o texto: {e}")
+            return
+        progress.empty()
+        st.session_state["ocr_markdown"] = "\n\n".join(parts)
+    if st.session_state.get("ocr_markdown"):
+        st.success("Texto extraído! Ele já preenche o campo de conteúdo dos templates; revise antes de salvar.")
+        if st.button("Descartar texto extraído", key=f"{key}_clear"):
+            st.session_state.pop("ocr_markdown", None)
+            st.rerun()
+
+# --- PÁGINA DE DESEMPENHO (ADMIN) ---
+def display_performance_page(repo):
+    metrics = get_metrics()
+    data = metrics.to_dict()
+    calls = data["calls_per_run"]
+    rate = repo.rate_limit() if repo else None
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Chamadas ao backend / rerun (média)", f"{sum(calls) / len(calls):.1f}" if calls else "–", help=f"Últimos {len(calls)} reruns; máximo {max(calls) if calls else 0}.")
+    c2.metric("Chamadas em segundo plano", data["counters"].get("backend.chamadas_em_segundo_plano", 0))
+    c3.metric("Rate limit restante", f"{rate[0]} / {rate[1]}" if rate else "Sem limite")
+    c4.metric("Coletando desde", datetime.fromtimestamp(data["started_at"]).strftime("%d/%m %H:%M"))
+    sync = repo.sync_status() if repo else None
+    if sync is not None:
+        last = datetime.fromtimestamp(sync["ultima"]).strftime("%d/%m %H:%M:%S") if sync["ultima"] else "ainda não concluída"
+        if sync["erro"]:
+            st.error(f"Sincronização com o remoto falhando: {sync['erro']} (última bem-sucedida: {last})")
+        else:
+            st.caption(f"Última sincronização com o remoto: {last}")
+
+    st.subheader("Caches")
+    cache_rows = []
+    for label, cache in [("Blobs (disco)", get_blob_cache()), ("Conteúdo (memória)", get_content_cache()), ("HTML renderizado", get_render_cache()), ("Listagem por pasta", get_listing_cache())]:
+        total = cache.hits + cache.misses
+        cache_rows.append({"Cache": label, "Acertos": cache.hits, "Falhas": cache.misses, "Taxa de acerto": f"{cache.hits / total:.0%}" if total else "–"})
+    st.dataframe(cache_rows, use_container_width=True, hide_index=True)
+    st.caption(" · ".join(f"{name}: {value}" for name, value in sorted(data["counters"].items())))
+
+    st.subheader("Latência por operação")
+    latency_rows = [
+        {"Operação": name, "Chamadas": h["count"], "Média (ms)": round(h["total_ms"] / h["count"], 1),
+         "p50 (ms)": round(Metrics.percentile(h, 0.5), 1), "p95 (ms)": round(Metrics.percentile(h, 0.95), 1), "Máx (ms)": round(h["max_ms"], 1)}
+        for name, h in sorted(data["latencies"].items())
+    ]
+    st.dataframe(latency_rows, use_container_width=True, hide_index=True)
+    if data["latencies"]:
+        name = st.selectbox("Histograma", sorted(data["latencies"]), key="perf_histogram")
+        labels = [f"≤{b:g} ms" if b != float("inf") else f">{LATENCY_BUCKETS_MS[-2]:g} ms" for b in LATENCY_BUCKETS_MS]
+        st.bar_chart(dict(zip(labels, data["latencies"][name]["buckets"])))
+
+    c1, c2 = st.columns(2)
+    c1.download_button("Exportar métricas (JSON)", json.dumps(data, indent=2), file_name="painel_metricas.json", mime="application/json")
+    if c2.button("Zerar métricas"):
+        metrics.reset()
+        st.rerun()
+
 # --- CÓDIGO PRINCIPAL DA APLICAÇÃO ---
 if not check_password():
     st.stop()
 
-apply_custom_styling()
-repo = get_github_repo()
+get_metrics().begin_run()
+# try/finally: reruns encerrados por st.rerun()/st.stop() (exclusões, gravações) também contam nas métricas
+try:
+    apply_custom_styling()
+    repo = get_storage_backend()
+    if repo:
+        start_warmup(repo)
 
-with st.sidebar:
-    st.info(f"Autenticado. {datetime.now(tz=datetime.now().astimezone().tzinfo).strftime('%d/%m/%Y %H:%M')}")
-    default_action = st.session_state.get("selected_action", "Leitor de Dossiês")
-    default_index = ["Leitor de Dossiês", "Carregar Dossiê", "Gerar com IA"].index(default_action)
-    selected_action = option_menu(menu_title="Menu Principal", options=["Leitor de Dossiês", "Carregar Dossiê", "Gerar com IA"], icons=["book-half", "cloud-arrow-up-fill", "cpu-fill"], menu_icon="collection-play", default_index=default_index, key="main_menu")
-    st.session_state.selected_action = selected_action
+    with st.sidebar:
+        st.info(f"Autenticado. {datetime.now(tz=datetime.now().astimezone().tzinfo).strftime('%d/%m/%Y %H:%M')}")
+        sync_state = repo.sync_status() if repo else None
+        if sync_state and sync_state["erro"]:
+            st.warning("Gravações recentes ainda não chegaram ao repositório remoto: a sincronização está falhando.")
+        menu_options = ["Leitor de Dossiês", "Carregar Dossiê", "Gerar com IA"]
+        menu_icons = ["book-half", "cloud-arrow-up-fill", "cpu-fill"]
+        if st.session_state.get("is_admin"):
+            menu_options.insert(2, "Desempenho")
+            menu_icons.insert(2, "speedometer2")
+        default_action = st.session_state.get("selected_action", "Leitor de Dossiês")
+        default_index = menu_options.index(default_action) if default_action in menu_options else 0
+        selected_action = option_menu(menu_title="Menu Principal", options=menu_options, icons=menu_icons, menu_icon="collection-play", default_index=default_index, key="main_menu")
+        st.session_state.selected_action = selected_action
 
-st.title("Sistema de Inteligência Tática")
+    st.title("Sistema de Inteligência Tática")
 
-if selected_action == "Leitor de Dossiês":
-    st.header("📖 Leitor de Dossiês")
-    if repo:
-        col1, col2 = st.columns([1, 2], gap="large")
-        with col1:
-            st.subheader("Navegador do Repositório")
-            st.text_input("Filtrar...", label_visibility="collapsed", placeholder="Filtrar por nome do arquivo...", key="search_term")
-            st.divider()
-            display_repo_structure(repo)
-        with col2:
-            st.subheader("Visualizador de Conteúdo")
-            if st.session_state.get("viewing_file_content"):
-                file_name = st.session_state.get("viewing_file_name", "")
-                st.markdown(f"#### {file_name}")
-                st.divider()
-                
-                theme_class = "theme-d1p1"
-                if file_name.startswith("D1P1_"):
-                    theme_class = "theme-d1p1"
-                elif file_name.startswith("D1P2_"):
-                    theme_class = "theme-d1p2"
-                elif file_name.startswith("D2P1_"):
-                    theme_class = "theme-d2p1"
-                elif file_name.startswith("D2P2_"):
-                    theme_class = "theme-d2p2"
-                elif file_name.startswith("D3_") or file_name.startswith("R"):
-                    theme_class = "theme-d3"
-                elif file_name.startswith("D4_"):
-                    theme_class = "theme-d4"
+    if selected_action != "Leitor de Dossiês":
+        # Saiu do leitor: o pré-carregamento pendente desta sessão não serve mais
+        get_prefetcher().cancel(get_session_key())
+
+    if selected_action == "Leitor de Dossiês":
+        st.header("📖 Leitor de Dossiês")
+        if repo:
+            col1, col2 = st.columns([1, 2], gap="large")
+            with col1:
+                st.subheader("Navegador do Repositório")
+                reader_mode = st.radio("Modo", ["Navegar", "Filtros", "Buscar no conteúdo"], horizontal=True, label_visibility="collapsed", key="reader_mode")
+                if reader_mode == "Buscar no conteúdo":
+                    display_content_search(repo)
+                elif reader_mode == "Filtros":
+                    display_facet_filters(repo)
+                else:
+                    st.text_input("Filtrar...", label_visibility="collapsed", placeholder="Filtrar por nome do arquivo...", key="search_term")
+                    lazy_navigator = st.toggle("Navegação leve", value=True, key="nav_lazy", help="Constrói apenas as pastas abertas e pagina pastas grandes.")
+                    st.divider()
+                    with get_metrics().timer("ui.navegador"):
+                        if lazy_navigator:
+                            display_lazy_navigator(repo)
+                        else:
+                            display_repo_structure(repo)
+            with col2:
+                st.subheader("Visualizador de Conteúdo")
+                viewing = st.session_state.get("viewing_file")
+                if viewing:
+                    file_name = viewing["name"]
+                    st.markdown(f"#### {file_name}")
+                    # A referência guardada na sessão é conferida com o snapshot atual
+                    snapshot = get_repo_snapshot(repo)
+                    current = snapshot.get_entry(viewing["path"]) if snapshot is not None else None
+                    if snapshot is not None and current is None:
+                        st.warning("Este dossiê foi removido do repositório. Exibindo a versão aberta anteriormente.")
+                    elif current is not None and current.sha != viewing["sha"]:
+                        st.warning("Este dossiê foi atualizado desde que foi aberto.")
+                        if st.button("Carregar versão atual", key="reload_viewing_file"):
+                            open_dossier(repo, current.path, current.name, current.sha)
+                            st.rerun()
+                    st.divider()
                 
-                sanitized_content = sanitize_text(st.session_state.viewing_file_content)
-                html_content = markdown2.markdown(sanitized_content, extras=['tables', 'fenced-code-blocks', 'blockquote'])
-                st.markdown(f"<div class='dossier-viewer {theme_class}'>{html_content}</div>", unsafe_allow_html=True)
-            else:
-                st.info("Selecione um arquivo para visualizar.")
-
-elif selected_action == "Carregar Dossiê":
-    st.header("Criar Novo Dossiê")
-    st.info("Selecione o tipo de dossiê, preencha as informações e o conteúdo em Markdown.")
-    dossier_type_options = ["", "D1 P1 - Análise da Liga", "D1 P2 - Análise dos Clubes Dominantes da Liga", "D2 P1 - Análise Comparativa de Planteis", "D2 P2 - Estudo Técnico e Tático dos Clubes", "D3 - Análise Tática (Pós Rodada)", "D4 - Briefing Semanal (Pré Rodada)"]
-    dossier_type = st.selectbox("**Qual tipo de dossiê você quer criar?**", dossier_type_options, key="dossier_type_selector")
-    help_text_md = "Guia Rápido:\n- Título: # Título\n- Subtítulo: ## Subtítulo\n- Destaque: **texto**"
+                    content = get_dossier_text(repo, viewing["path"], viewing["sha"])
+                    if content is not None:
+                        theme_class = get_theme_class(file_name)
+                        # ALTERAÇÃO: HTML servido do cache de renderização enquanto o blob não mudar
+                        html = render_dossier_html(content, viewing["sha"], theme_class)
+                        st.markdown(html, unsafe_allow_html=True)
+                else:
+                    st.info("Selecione um arquivo para visualizar.")
+
+    elif selected_action == "Carregar Dossiê":
+        st.header("Criar Novo Dossiê")
+        st.info("Selecione o tipo de dossiê, preencha as informações e o conteúdo em Markdown.")
+        dossier_type_options = ["", "D1 P1 - Análise da Liga", "D1 P2 - Análise dos Clubes Dominantes da Liga", "D2 P1 - Análise Comparativa de Planteis", "D2 P2 - Estudo Técnico e Tático dos Clubes", "D3 - Análise Tática (Pós Rodada)", "D4 - Briefing Semanal (Pré Rodada)", "Importação em Lote (ZIP ou vários .md)"]
+        dossier_type = st.selectbox("**Qual tipo de dossiê você quer criar?**", dossier_type_options, key="dossier_type_selector")
+        help_text_md = "Guia Rápido:\n- Título: # Título\n- Subtítulo: ## Subtítulo\n- Destaque: **texto**"
+        if dossier_type and dossier_type != "Importação em Lote (ZIP ou vários .md)":
+            with st.expander("📷 Extrair texto de imagem ou PDF escaneado (OCR)"):
+                display_ocr_ingest("ocr_upload")
+        ocr_text = st.session_state.get("ocr_markdown", "")
     
-    if dossier_type == "D1 P1 - Análise da Liga":
-        with st.form("d1_p1_form", clear_on_submit=True):
-            st.subheader("Template: Análise da Liga")
-            c1, c2, c3 = st.columns(3)
-            pais = c1.text_input("País*")
-            liga = c2.text_input("Liga*")
-            temporada = c3.text_input("Temporada*")
-            conteudo = st.text_area("Resumo (Conteúdo do Dossiê)*", height=300, help=help_text_md)
-            if st.form_submit_button("Salvar Dossiê", type="primary"):
-                save_dossier(repo, "D1P1_Analise_Liga_{liga}_{pais}", [pais, liga, temporada], conteudo, {"liga": liga, "pais": pais, "temporada": temporada, "conteudo": conteudo})
+        if dossier_type == "D1 P1 - Análise da Liga":
+            with st.form("d1_p1_form", clear_on_submit=True):
+                st.subheader("Template: Análise da Liga")
+                c1, c2, c3 = st.columns(3)
+                pais = c1.text_input("País*")
+                liga = c2.text_input("Liga*")
+                temporada = c3.text_input("Temporada*")
+                conteudo = st.text_area("Resumo (Conteúdo do Dossiê)*", height=300, help=help_text_md, value=ocr_text)
+                if st.form_submit_button("Salvar Dossiê", type="primary"):
+                    save_dossier(repo, "D1P1_Analise_Liga_{liga}_{pais}", [pais, liga, temporada], conteudo, {"liga": liga, "pais": pais, "temporada": temporada, "conteudo": conteudo})
     
-    elif dossier_type == "D1 P2 - Análise dos Clubes Dominantes da Liga":
-        with st.form("d1_p2_form", clear_on_submit=True):
-            st.subheader("Template: Análise dos Clubes Dominantes")
-            c1, c2, c3 = st.columns(3)
-            pais = c1.text_input("País*")
-            liga = c2.text_input("Liga*")
-            temporada = c3.text_input("Temporada*")
-            conteudo = st.text_area("Resumo (Conteúdo da Análise)*", height=300, help=help_text_md)
-            if st.form_submit_button("Salvar Dossiê", type="primary"):
-                save_dossier(repo, "D1P2_Clubes_Dominantes_{liga}_{pais}", [pais, liga, temporada], conteudo, {"liga": liga, "pais": pais, "temporada": temporada, "conteudo": conteudo})
-
-    elif dossier_type == "D2 P1 - Análise Comparativa de Planteis":
-        with st.form("d2_p1_form", clear_on_submit=True):
-            st.subheader("Template: Análise Comparativa de Planteis")
-            c1, c2, c3, c4 = st.columns(4)
-            pais = c1.text_input("País*")
-            liga = c2.text_input("Liga*")
-            temporada = c3.text_input("Temporada*")
-            clube = c4.text_input("Clube*")
-            conteudo = st.text_area("Resumo (Conteúdo da Análise)*", height=300, help=help_text_md)
-            if st.form_submit_button("Salvar Dossiê", type="primary"):
-                save_dossier(repo, "D2P1_Planteis_{clube}_{temporada}", [pais, liga, temporada, clube], conteudo, {"clube": clube, "temporada": temporada, "conteudo": conteudo, "pais": pais, "liga": liga})
-
-    elif dossier_type == "D2 P2 - Estudo Técnico e Tático dos Clubes":
-        with st.form("d2_p2_form", clear_on_submit=True):
-            st.subheader("Template: Estudo Técnico e Tático dos Clubes")
-            c1, c2, c3, c4 = st.columns(4)
-            pais = c1.text_input("País*")
-            liga = c2.text_input("Liga*")
-            temporada = c3.text_input("Temporada*")
-            clube = c4.text_input("Clube*")
-            conteudo = st.text_area("Resumo (Conteúdo do Estudo)*", height=300, help=help_text_md)
-            if st.form_submit_button("Salvar Dossiê", type="primary"):
-                save_dossier(repo, "D2P2_Estudo_Tatico_{clube}_{temporada}", [pais, liga, temporada, clube], conteudo, {"clube": clube, "temporada": temporada, "conteudo": conteudo, "pais": pais, "liga": liga})
-
-    elif dossier_type == "D3 - Análise Tática (Pós Rodada)":
-        with st.form("d3_form", clear_on_submit=True):
-            st.subheader("Template: Análise Pós Rodada")
-            c1, c2, c3 = st.columns(3)
-            pais = c1.text_input("País*")
-            liga = c2.text_input("Liga*")
-            temporada = c3.text_input("Temporada*")
-            st.divider()
-            st.write("**Informações da Partida**")
-            c1, c2, c3 = st.columns(3)
-            rodada = c1.text_input("Rodada*", placeholder="Ex: 15")
-            time_casa = c2.text_input("Time da Casa*")
-            time_visitante = c3.text_input("Time Visitante*")
-            st.divider()
-            conteudo = st.text_area("Resumo (Conteúdo da Análise)*", height=300, help=help_text_md)
-            if st.form_submit_button("Salvar Dossiê", type="primary"):
-                save_dossier(repo, "D3_PosRodada_{time_casa}_vs_{time_visitante}", [pais, liga, temporada, "Rodadas", f"R{rodada}"], conteudo, {"pais": pais, "liga": liga, "temporada": temporada, "rodada": rodada, "time_casa": time_casa, "time_visitante": time_visitante, "conteudo": conteudo})
+        elif dossier_type == "D1 P2 - Análise dos Clubes Dominantes da Liga":
+            with st.form("d1_p2_form", clear_on_submit=True):
+                st.subheader("Template: Análise dos Clubes Dominantes")
+                c1, c2, c3 = st.columns(3)
+                pais = c1.text_input("País*")
+                liga = c2.text_input("Liga*")
+                temporada = c3.text_input("Temporada*")
+                conteudo = st.text_area("Resumo (Conteúdo da Análise)*", height=300, help=help_text_md, value=ocr_text)
+                if st.form_submit_button("Salvar Dossiê", type="primary"):
+                    save_dossier(repo, "D1P2_Clubes_Dominantes_{liga}_{pais}", [pais, liga, temporada], conteudo, {"liga": liga, "pais": pais, "temporada": temporada, "conteudo": conteudo})
+
+        elif dossier_type == "D2 P1 - Análise Comparativa de Planteis":
+            with st.form("d2_p1_form", clear_on_submit=True):
+                st.subheader("Template: Análise Comparativa de Planteis")
+                c1, c2, c3, c4 = st.columns(4)
+                pais = c1.text_input("País*")
+                liga = c2.text_input("Liga*")
+                temporada = c3.text_input("Temporada*")
+                clube = c4.text_input("Clube*")
+                conteudo = st.text_area("Resumo (Conteúdo da Análise)*", height=300, help=help_text_md, value=ocr_text)
+                if st.form_submit_button("Salvar Dossiê", type="primary"):
+                    save_dossier(repo, "D2P1_Planteis_{clube}_{temporada}", [pais, liga, temporada, clube], conteudo, {"clube": clube, "temporada": temporada, "conteudo": conteudo, "pais": pais, "liga": liga})
+
+        elif dossier_type == "D2 P2 - Estudo Técnico e Tático dos Clubes":
+            with st.form("d2_p2_form", clear_on_submit=True):
+                st.subheader("Template: Estudo Técnico e Tático dos Clubes")
+                c1, c2, c3, c4 = st.columns(4)
+                pais = c1.text_input("País*")
+                liga = c2.text_input("Liga*")
+                temporada = c3.text_input("Temporada*")
+                clube = c4.text_input("Clube*")
+                conteudo = st.text_area("Resumo (Conteúdo do Estudo)*", height=300, help=help_text_md, value=ocr_text)
+                if st.form_submit_button("Salvar Dossiê", type="primary"):
+                    save_dossier(repo, "D2P2_Estudo_Tatico_{clube}_{temporada}", [pais, liga, temporada, clube], conteudo, {"clube": clube, "temporada": temporada, "conteudo": conteudo, "pais": pais, "liga": liga})
+
+        elif dossier_type == "D3 - Análise Tática (Pós Rodada)":
+            with st.form("d3_form", clear_on_submit=True):
+                st.subheader("Template: Análise Pós Rodada")
+                c1, c2, c3 = st.columns(3)
+                pais = c1.text_input("País*")
+                liga = c2.text_input("Liga*")
+                temporada = c3.text_input("Temporada*")
+                st.divider()
+                st.write("**Informações da Partida**")
+                c1, c2, c3 = st.columns(3)
+                rodada = c1.text_input("Rodada*", placeholder="Ex: 15")
+                time_casa = c2.text_input("Time da Casa*")
+                time_visitante = c3.text_input("Time Visitante*")
+                st.divider()
+                conteudo = st.text_area("Resumo (Conteúdo da Análise)*", height=300, help=help_text_md, value=ocr_text)
+                if st.form_submit_button("Salvar Dossiê", type="primary"):
+                    save_dossier(repo, "D3_PosRodada_{time_casa}_vs_{time_visitante}", [pais, liga, temporada, "Rodadas", f"R{rodada}"], conteudo, {"pais": pais, "liga": liga, "temporada": temporada, "rodada": rodada, "time_casa": time_casa, "time_visitante": time_visitante, "conteudo": conteudo})
     
-    elif dossier_type == "D4 - Briefing Semanal (Pré Rodada)":
-        with st.form("d4_form", clear_on_submit=True):
-            st.subheader("Template: Briefing Pré Rodada")
-            c1, c2, c3 = st.columns(3)
-            pais = c1.text_input("País*")
-            liga = c2.text_input("Liga*")
-            temporada = c3.text_input("Temporada*")
-            st.divider()
-            st.write("**Informações da Partida**")
-            c1, c2, c3 = st.columns(3)
-            rodada = c1.text_input("Rodada*", placeholder="Ex: 16")
-            nosso_clube = c2.text_input("Nosso Clube*")
-            adversario = c3.text_input("Próximo Adversário*")
-            st.divider()
-            conteudo = st.text_area("Resumo (Conteúdo do Briefing)*", height=300, help=help_text_md)
-            if st.form_submit_button("Salvar Dossiê", type="primary"):
-                save_dossier(repo, "D4_Briefing_{nosso_clube}_vs_{adversario}", [pais, liga, temporada, nosso_clube, "Rodadas", f"R{rodada}"], conteudo, {"pais": pais, "liga": liga, "temporada": temporada, "rodada": rodada, "nosso_clube": nosso_clube, "adversario": adversario, "conteudo": conteudo})
-
-    elif dossier_type:
-        st.warning(f"O template para '{dossier_type}' ainda está em desenvolvimento.")
-
-elif selected_action == "Gerar com IA":
-    st.header("Gerar com IA")
-    st.info("Em desenvolvimento.")
+        elif dossier_type == "D4 - Briefing Semanal (Pré Rodada)":
+            with st.form("d4_form", clear_on_submit=True):
+                st.subheader("Template: Briefing Pré Rodada")
+                c1, c2, c3 = st.columns(3)
+                pais = c1.text_input("País*")
+                liga = c2.text_input("Liga*")
+                temporada = c3.text_input("Temporada*")
+                st.divider()
+                st.write("**Informações da Partida**")
+                c1, c2, c3 = st.columns(3)
+                rodada = c1.text_input("Rodada*", placeholder="Ex: 16")
+                nosso_clube = c2.text_input("Nosso Clube*")
+                adversario = c3.text_input("Próximo Adversário*")
+                st.divider()
+                conteudo = st.text_area("Resumo (Conteúdo do Briefing)*", height=300, help=help_text_md, value=ocr_text)
+                if st.form_submit_button("Salvar Dossiê", type="primary"):
+                    save_dossier(repo, "D4_Briefing_{nosso_clube}_vs_{adversario}", [pais, liga, temporada, nosso_clube, "Rodadas", f"R{rodada}"], conteudo, {"pais": pais, "liga": liga, "temporada": temporada, "rodada": rodada, "nosso_clube": nosso_clube, "adversario": adversario, "conteudo": conteudo})
+
+        elif dossier_type == "Importação em Lote (ZIP ou vários .md)":
+            display_bulk_import(repo)
+
+        elif dossier_type:
+            st.warning(f"O template para '{dossier_type}' ainda está em desenvolvimento.")
+
+    elif selected_action == "Desempenho" and st.session_state.get("is_admin"):
+        st.header("⏱️ Desempenho")
+        display_performance_page(repo)
+
+    elif selected_action == "Gerar com IA":
+        st.header("Gerar com IA")
+        st.info("Em desenvolvimento.")
+        st.subheader("Extrair texto de relatórios escaneados")
+        display_ocr_ingest("ocr_ai")
+        if st.session_state.get("ocr_markdown"):
+            st.text_area("Texto extraído (Markdown)", st.session_state["ocr_markdown"], height=300, disabled=True)
+finally:
+    get_metrics().end_run()